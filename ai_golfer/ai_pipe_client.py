@@ -6,8 +6,13 @@ Improved version with REAL MapLoader terrain detection (no more false sand).
 
 import struct
 import os
+import collections
+import fcntl
+import logging
+import threading
 import time
 import math
+from concurrent.futures import ThreadPoolExecutor
 from high_level_planner import HighLevelPlanner
 from low_level_optimizer import ShotOptimizer
 from map_loader import MapLoader
@@ -15,236 +20,326 @@ from map_loader import MapLoader
 AI_PIPE = "/tmp/golf_ai_pipe"
 STATE_PIPE = "/tmp/golf_state_pipe"
 
+logger = logging.getLogger(__name__)
+
+# Wire formats shared with the C engine, compiled once at import.
+_STATE_STRUCT = struct.Struct("<8fi??xx")   # GameStateMsg: EXACT 40 bytes
+_CMD_STRUCT = struct.Struct("<6f")          # AICommand: 24 bytes
+
+GameState = collections.namedtuple(
+    "GameState",
+    "ball_x ball_y ball_z hole_x hole_y wind_x wind_y wind_strength strokes stopped won"
+)
+
+# Aim offsets tried when the direct path is blocked: (degrees, cos, sin)
+_AIM_OFFSETS = tuple(
+    (deg, math.cos(math.radians(deg)), math.sin(math.radians(deg)))
+    for deg in (15, 30, 45, 60, -15, -30, -45, -60)
+)
+
 
 class PipeAIClient:
     """AI client that communicates with C game via pipes"""
 
     def __init__(self, fast_mode=True):
-        self.planner = HighLevelPlanner()
-        self.optimizer = ShotOptimizer()
         self.map_loader = MapLoader()
+        self.planner = HighLevelPlanner(map_loader=self.map_loader)
+        self.optimizer = ShotOptimizer(map_loader=self.map_loader)
         self.fast_mode = fast_mode
-        self.last_distance_moved = 0.0
-
-        print("Waiting for C game to start...")
+        self.last_distance_moved = 0.0     # ball travel between the last two decided strokes
+        self._prev_pos = None              # ball position the last stroke was decided from
+        self._cmd_buf = bytearray(_CMD_STRUCT.size)
+        self._state_buf = bytearray(_STATE_STRUCT.size)
+        self._state_view = memoryview(self._state_buf)
+        self._last_blocked_offset = None   # index into _AIM_OFFSETS that last cleared a block
+
+        # single-slot "latest state" buffer filled by the reader thread
+        self._latest = None
+        self._state_closed = False
+        self._state_cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+        logger.info("Waiting for C game to start...")
         while not (os.path.exists(AI_PIPE) and os.path.exists(STATE_PIPE)):
             time.sleep(0.1)
 
-        print("Opening pipes...")
-        import fcntl
+        logger.info("Opening pipes...")
+        self.ai_fd = os.open(AI_PIPE, os.O_WRONLY | os.O_NONBLOCK)
 
-        ai_fd = os.open(AI_PIPE, os.O_WRONLY | os.O_NONBLOCK)
-        self.ai_pipe = os.fdopen(ai_fd, 'wb', buffering=0)
+        # State pipe stays blocking: the reader sleeps in the kernel until
+        # the C engine writes a frame instead of polling.
+        self.state_fd = os.open(STATE_PIPE, os.O_RDONLY)
 
-        state_fd = os.open(STATE_PIPE, os.O_RDONLY | os.O_NONBLOCK)
-        self.state_pipe = os.fdopen(state_fd, 'rb', buffering=0)
+        logger.info("Connected to game!")
 
-        print("Connected to game!")
+        self._reader = threading.Thread(target=self._reader_loop, daemon=True)
+        self._reader.start()
 
     # ------------------------------------------------------------
 
     def read_game_state(self):
-        """Read game state from C engine (exact 40-byte struct)."""
+        """Block until the reader thread has a new state frame.
+
+        Only the newest frame is kept, so a slow decision never leaves a
+        backlog behind it. Returns None once the game closes its end of
+        the pipe.
+        """
+        with self._state_cond:
+            while self._latest is None and not self._state_closed:
+                self._state_cond.wait()
+            state, self._latest = self._latest, None
+        return state
+
+    def _reader_loop(self):
+        """Reader thread: keep the pipe drained into the latest-state slot."""
+        while True:
+            state = self._read_frame()
+            with self._state_cond:
+                if state is None:
+                    self._state_closed = True
+                else:
+                    self._latest = state
+                self._state_cond.notify()
+            if state is None:
+                return
+
+    def _read_frame(self):
+        """Block until a full state frame arrives (exact 40-byte struct).
+
+        Frames already queued behind it are drained and only the newest
+        one is returned. Returns None on EOF.
+        """
+        view = self._state_view
         try:
-            fmt = "<8fi??xx"           # EXACT layout: 40 bytes
-            expected_size = 40
-            data = self.state_pipe.read(expected_size)
-
-            if not data or len(data) < expected_size:
+            if not self._fill(view):
                 return None
 
-            values = struct.unpack(fmt, data)
-
-            return {
-                'ball_x': values[0],
-                'ball_y': values[1],
-                'ball_z': values[2],
-                'hole_x': values[3],
-                'hole_y': values[4],
-                'wind_x': values[5],
-                'wind_y': values[6],
-                'wind_strength': values[7],
-                'strokes': values[8],
-                'stopped': values[9],
-                'won': values[10]
-            }
-
-        except BlockingIOError:
-            return None
-        except Exception:
+            # drain without blocking; each frame read overwrites the older one
+            flags = fcntl.fcntl(self.state_fd, fcntl.F_GETFL)
+            fcntl.fcntl(self.state_fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+            try:
+                while True:
+                    try:
+                        n = os.readv(self.state_fd, [view])
+                    except BlockingIOError:
+                        break
+                    if n == 0:
+                        break
+                    if n < len(view):
+                        # torn frame: finish it with blocking reads
+                        fcntl.fcntl(self.state_fd, fcntl.F_SETFL, flags)
+                        if not self._fill(view[n:]):
+                            return None
+                        fcntl.fcntl(self.state_fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+            finally:
+                fcntl.fcntl(self.state_fd, fcntl.F_SETFL, flags)
+        except OSError:
             return None
 
+        return GameState._make(_STATE_STRUCT.unpack_from(self._state_buf))
+
+    def _fill(self, view):
+        """Blocking read until `view` is full; False on EOF."""
+        got = 0
+        # FIFOs can return short reads; keep the cursor and read the rest
+        while got < len(view):
+            n = os.readv(self.state_fd, [view[got:]])
+            if n == 0:
+                return False
+            got += n
+        return True
 
     # ------------------------------------------------------------
 
     def send_shot(self, dirx, diry, angle, power, spinx=0.0, spiny=0.0):
         """Send final shot params to C"""
-        data = struct.pack('6f', dirx, diry, angle, power, spinx, spiny)
-        self.ai_pipe.write(data)
-        self.ai_pipe.flush()
-        print(f"  → Sent: dir=({dirx:.3f},{diry:.3f}) angle={angle:.1f}° power={power:.1f}")
+        _CMD_STRUCT.pack_into(self._cmd_buf, 0, dirx, diry, angle, power, spinx, spiny)
+        os.write(self.ai_fd, self._cmd_buf)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("  → Sent: dir=(%.3f,%.3f) angle=%.1f° power=%.1f", dirx, diry, angle, power)
 
     # ------------------------------------------------------------
 
     def play(self):
         """Main AI loop"""
-        print("\n" + "="*60)
-        print("🤖 AI GOLFER - Playing via C visualization")
-        print("="*60)
+        logger.info("\n" + "="*60)
+        logger.info("🤖 AI GOLFER - Playing via C visualization")
+        logger.info("="*60)
 
-        last_ball_pos = None
-        no_state_count = 0
         shot_sent = False
+        pending = None   # decision running on the worker thread
+
 
         while True:
             state = self.read_game_state()
-            if not state:
-                no_state_count += 1
-                if no_state_count % 50 == 0:
-                    print(f"Waiting for game state... ({no_state_count} attempts)")
-                time.sleep(0.1)
-                continue
-
-            no_state_count = 0
+            if state is None:
+                logger.info("\nGame closed the state pipe")
+                break
 
-            if state['won']:
-                print(f"\n🏆 HOLE IN! Total strokes: {state['strokes']}")
+            if state.won:
+                logger.info("\n🏆 HOLE IN! Total strokes: %d", state.strokes)
                 break
 
-            if not state['stopped']:
+            # frames that arrive while optimizing are only watched for won/closed
+            if pending is not None:
+                if not pending.done():
+                    continue
+                pending.result()   # re-raise optimizer errors here
+                pending = None
+                shot_sent = True
+
+            if not state.stopped:
                 shot_sent = False
-                time.sleep(0.1)
                 continue
 
-            current_pos = (state['ball_x'], state['ball_y'])
+            current_pos = (state.ball_x, state.ball_y)
+
+            # squared movement since the last shot, shared by both guards below
+            moved2 = None
+            if self._prev_pos is not None:
+                mx = current_pos[0] - self._prev_pos[0]
+                my = current_pos[1] - self._prev_pos[1]
+                moved2 = mx * mx + my * my
 
             # Only shoot when ball has stopped AND didn’t just do a micro-jump
             if shot_sent:
-                if last_ball_pos is not None:
-                    dist_moved = math.dist(current_pos, last_ball_pos)
-                    if dist_moved > 1.0:
-                        shot_sent = False
-                        print(f"Ball moved {dist_moved:.1f}px, ready for next shot")
-                time.sleep(0.1)
+                if moved2 is not None and moved2 > 1.0:
+                    shot_sent = False
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Ball moved %.1fpx, ready for next shot", math.sqrt(moved2))
                 continue
 
-            if last_ball_pos is not None:
-                dist_moved = math.dist(current_pos, last_ball_pos)
-                if dist_moved < 1.0:  # no real movement
-                    time.sleep(0.1)
-                    continue
-
-            last_ball_pos = current_pos
-
-            ball_x, ball_y = state['ball_x'], state['ball_y']
-            hole_x, hole_y = state['hole_x'], state['hole_y']
-
-            distance = math.dist((ball_x, ball_y), (hole_x, hole_y))
-
-            print(f"\n--- Stroke {state['strokes'] + 1} ---")
-            print(f"Ball: ({ball_x:.1f}, {ball_y:.1f})")
-            print(f"Hole: ({hole_x:.1f}, {hole_y:.1f})")
-            print(f"Distance: {distance:.1f} px")
-
-            # ------------------------------------------------------------
-            # REAL SAND DETECTION (via MapLoader)
-            # ------------------------------------------------------------
-            if self.map_loader.is_sand(ball_x, ball_y):
-                current_terrain = "sand"
-                print("  🏖️ SAND DETECTED BY MAP")
-            else:
-                current_terrain = "fairway"
-
-            # ------------------------------------------------------------
-            # Plan strategy
-            # ------------------------------------------------------------
-            shot_type, target_x, target_y = self.planner.plan_strategy(
-                ball_x, ball_y, hole_x, hole_y,
-                terrain_map=self.map_loader,
-                current_terrain=current_terrain,
-                wind_x=state['wind_x'], wind_y=state['wind_y'], wind_strength=state['wind_strength']
-            )
-
+            if moved2 is not None and moved2 < 1.0:  # no real movement
+                continue
 
-            print(f"Strategy: {shot_type.upper()}")
+            self.last_distance_moved = 0.0 if moved2 is None else math.sqrt(moved2)
+            self._prev_pos = current_pos
+
+            pending = self._executor.submit(self._decide_and_send, state)
+
+    def _decide_and_send(self, state):
+        """Plan, optimize and send one stroke (runs on the worker thread)."""
+        ball_x, ball_y = state.ball_x, state.ball_y
+        hole_x, hole_y = state.hole_x, state.hole_y
+
+        current_pos = (ball_x, ball_y)
+
+        logger.info("\n--- Stroke %d ---", state.strokes + 1)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Ball: (%.1f, %.1f)", ball_x, ball_y)
+            logger.debug("Hole: (%.1f, %.1f)", hole_x, hole_y)
+            logger.debug("Distance: %.1f px", math.dist(current_pos, (hole_x, hole_y)))
+            logger.debug("Moved since last stroke: %.1f px", self.last_distance_moved)
+
+        # ------------------------------------------------------------
+        # REAL SAND DETECTION (via MapLoader)
+        # ------------------------------------------------------------
+        if self.map_loader.is_sand(ball_x, ball_y):
+            current_terrain = "sand"
+            logger.debug("  🏖️ SAND DETECTED BY MAP")
+        else:
+            current_terrain = "fairway"
+
+        # ------------------------------------------------------------
+        # Plan strategy
+        # ------------------------------------------------------------
+        shot_type, target_x, target_y = self.planner.plan_strategy(
+            ball_x, ball_y, hole_x, hole_y,
+            terrain_map=self.map_loader,
+            current_terrain=current_terrain,
+            wind_x=state.wind_x, wind_y=state.wind_y, wind_strength=state.wind_strength,
+            optimizer=None if self.fast_mode else self.optimizer
+        )
+
+
+        logger.debug("Strategy: %s", shot_type.name)
+
+        # ------------------------------------------------------------
+        # Path check
+        # ------------------------------------------------------------
+        is_clear, hazard_count, sand_count = self.map_loader.check_path_clear(
+            ball_x, ball_y, target_x, target_y
+        )
+
+        if not is_clear and current_terrain != 'sand':
+            logger.debug("  ⚠️ Path blocked! Hazards=%d, Sand=%d", hazard_count, sand_count)
+
+            dx = target_x - ball_x
+            dy = target_y - ball_y
+
+            best_target = None
+            best_sand = sand_count
+
+            # obstacles persist between strokes: retry the last working offset first
+            order = range(len(_AIM_OFFSETS))
+            last = self._last_blocked_offset
+            if last is not None:
+                order = [last] + [i for i in order if i != last]
+
+            for i in order:
+                angle_deg, cos_a, sin_a = _AIM_OFFSETS[i]
+                alt_x = ball_x + dx * cos_a - dy * sin_a
+                alt_y = ball_y + dx * sin_a + dy * cos_a
+
+                clear, h2, s2 = self.map_loader.check_path_clear_cached(
+                    ball_x, ball_y, alt_x, alt_y
+                )
 
-            # ------------------------------------------------------------
-            # Path check
-            # ------------------------------------------------------------
-            is_clear, hazard_count, sand_count = self.map_loader.check_path_clear(
-                ball_x, ball_y, target_x, target_y
+                if clear:
+                    best_target = (alt_x, alt_y)
+                    self._last_blocked_offset = i
+                    logger.debug("  ↰ Adjusted aim by %d°", abs(angle_deg))
+                    break
+
+                elif s2 < best_sand:
+                    best_sand = s2
+                    best_target = (alt_x, alt_y)
+
+            if best_target:
+                target_x, target_y = best_target
+
+        # ------------------------------------------------------------
+        # Optimizer call
+        # ------------------------------------------------------------
+        angle_hint = self.planner.get_angle(shot_type)
+
+        if self.fast_mode:
+            dirx, diry, angle, power = self.optimizer.quick_optimize(
+                ball_x, ball_y, target_x, target_y, angle_hint,
+                state.wind_x, state.wind_y, state.wind_strength,
+                terrain=current_terrain
+            )
+            spinx = spiny = 0.0
+        else:
+            dirx, diry, angle, power, spinx, spiny = self.optimizer.optimize_shot(
+                ball_x, ball_y, target_x, target_y, angle_hint,
+                state.wind_x, state.wind_y, state.wind_strength
             )
 
-            if not is_clear and current_terrain != 'sand':
-                print(f"  ⚠️ Path blocked! Hazards={hazard_count}, Sand={sand_count}")
-
-                dx = target_x - ball_x
-                dy = target_y - ball_y
-
-                best_target = None
-                best_sand = sand_count
-
-                for angle_deg in [15, 30, 45, 60, -15, -30, -45, -60]:
-                    a = math.radians(angle_deg)
-                    cos_a, sin_a = math.cos(a), math.sin(a)
-
-                    new_dx = dx * cos_a - dy * sin_a
-                    new_dy = dx * sin_a + dy * cos_a
-
-                    alt_x = ball_x + new_dx
-                    alt_y = ball_y + new_dy
-
-                    clear, h2, s2 = self.map_loader.check_path_clear(
-                        ball_x, ball_y, alt_x, alt_y
-                    )
-
-                    if clear:
-                        best_target = (alt_x, alt_y)
-                        print(f"  ↰ Adjusted aim by {abs(angle_deg)}°")
-                        break
-
-                    elif s2 < best_sand:
-                        best_sand = s2
-                        best_target = (alt_x, alt_y)
-
-                if best_target:
-                    target_x, target_y = best_target
-
-            # ------------------------------------------------------------
-            # Optimizer call
-            # ------------------------------------------------------------
-            angle_hint = self.planner.get_shot_parameters(shot_type)["angle"]
-
-            if self.fast_mode:
-                dirx, diry, angle, power = self.optimizer.quick_optimize(
-                    ball_x, ball_y, target_x, target_y, angle_hint,
-                    state['wind_x'], state['wind_y'], state['wind_strength'],
-                    terrain=current_terrain
-                )
-                spinx = spiny = 0.0
-            else:
-                dirx, diry, angle, power, spinx, spiny = self.optimizer.optimize_shot(
-                    ball_x, ball_y, target_x, target_y, angle_hint,
-                    state['wind_x'], state['wind_y'], state['wind_strength']
-                )
-
-            self.send_shot(dirx, diry, angle, power, spinx, spiny)
-            shot_sent = True
-            time.sleep(0.5)
+        self.send_shot(dirx, diry, angle, power, spinx, spiny)
 
     # ------------------------------------------------------------
 
     def close(self):
-        self.state_pipe.close()
-        self.ai_pipe.close()
+        self._executor.shutdown(wait=False)
+        self.optimizer.close()
+        os.close(self.state_fd)
+        os.close(self.ai_fd)
 
 
 def main():
         import argparse
         parser = argparse.ArgumentParser(description="AI Pipe Client")
         parser.add_argument("--slow", action="store_true", help="Use full CMA-ES optimization")
+        parser.add_argument("-v", "--verbose", action="store_true", help="Log per-stroke details")
         args = parser.parse_args()
 
+        logging.basicConfig(format="%(message)s", level=logging.INFO)
+        if args.verbose:
+            # only this app's loggers: numba and PIL log heavily at DEBUG
+            for name in (__name__, HighLevelPlanner.__module__, ShotOptimizer.__module__):
+                logging.getLogger(name).setLevel(logging.DEBUG)
+
         try:
             client = PipeAIClient(fast_mode=not args.slow)
             client.play()
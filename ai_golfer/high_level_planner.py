@@ -3,52 +3,136 @@ High-Level Planner - Strategic waypoint selection using MapLoader terrain analys
 Avoids sand, avoids hazards, smart in wind, uses real pixel-based terrain.
 """
 
+import bisect
+import logging
 import math
-from typing import List, Tuple, Optional, Dict
+from enum import IntEnum
+from typing import Tuple, Optional, Dict
+import numpy as np
 from surrogate_physics import SurrogatePhysics
-from map_loader import MapLoader
+from map_loader import MapLoader, LANDING_SAND_PENALTY
+from numba_compat import njit
 
+logger = logging.getLogger(__name__)
 
-class ShotType:
-    DRIVE = "drive"
-    LAYUP = "layup"
-    CHIP = "chip"
-    LOB = "lob"
-    PUTT = "putt"
+
+class ShotType(IntEnum):
+    DRIVE = 0
+    LAYUP = 1
+    CHIP = 2
+    LOB = 3
+    PUTT = 4
+
+
+# -------------------------------------------------------------
+#   Geometry kernels (JIT-compiled when numba is available)
+# -------------------------------------------------------------
+
+@njit(cache=True)
+def _waypoint_njit(bx, by, hx, hy, d, w, h, max_shot):
+    """Point max_shot px from the ball toward the hole, kept 20px inside the map."""
+    if d <= max_shot:
+        return hx, hy
+    wx = bx + (hx - bx) / d * max_shot
+    wy = by + (hy - by) / d * max_shot
+    return max(20.0, min(w - 20.0, wx)), max(20.0, min(h - 20.0, wy))
+
+
+@njit(cache=True)
+def _fan_njit(bx, by, hx, hy, cos_off, sin_off, frac, w, h):
+    """
+    Fan of landing candidates toward the hole: (xs, ys, target distances).
+    Candidate i is rotated by the precomputed offset (cos_off[i], sin_off[i])
+    from the ball->hole bearing, so no trig is evaluated per call.
+    """
+    distance = math.hypot(hx - bx, hy - by)
+    if distance > 0.0:
+        cos_b = (hx - bx) / distance
+        sin_b = (hy - by) / distance
+    else:
+        cos_b, sin_b = 1.0, 0.0  # atan2(0, 0) == 0
+    reach = min(distance, 250.0)
+
+    n = cos_off.shape[0]
+    xs = np.empty(n)
+    ys = np.empty(n)
+    dists = np.empty(n)
+    for i in range(n):
+        dist = reach * frac[i]
+        # angle-sum identity: cos/sin(base + offset)
+        xs[i] = max(20.0, min(w - 20.0, bx + (cos_b * cos_off[i] - sin_b * sin_off[i]) * dist))
+        ys[i] = max(20.0, min(h - 20.0, by + (sin_b * cos_off[i] + cos_b * sin_off[i]) * dist))
+        dists[i] = dist
+    return xs, ys, dists
+
+
+# fan rays are 0.2 rad apart until the fan reaches ±FAN_MAX_HALF_SPAN (~±86
+# degrees); larger fans pack their rays denser inside that span instead
+FAN_MAX_HALF_SPAN = 1.5
+
+
+def _fan_table(n):
+    """(cos, sin) of the fan angle offsets and the reach fraction per candidate."""
+    half = min((n - 1) / 2 * 0.2, FAN_MAX_HALF_SPAN)
+    offsets = np.linspace(-half, half, n)
+    frac = 0.75 + (np.arange(n) / max(1, n)) * 0.25
+    return np.cos(offsets), np.sin(offsets), frac
+
+
+# fan tables for the candidate counts the planner uses; others are added on demand
+_FAN_TABLES = {n: _fan_table(n) for n in (8, 12, 16)}
+
+
+# fan rays with this many hazard samples are skipped; a fully blocked fan is
+# retried with FAN_WIDE_CANDIDATES denser rays over the capped span
+FAN_MAX_RAY_HAZARDS = 2
+FAN_WIDE_CANDIDATES = 32
+
+# plan_strategy memo: keyed on the ball truncated to 1px and wind rounded to
+# 0.1, cleared when full
+PLAN_CACHE_SIZE = 4096
+
+# fan candidates handed to the optimizer for pre-optimization in plan_strategy
+REFINE_TOP_K = 4
+
+
+# Probe offsets (px) around the ball used to locate the local sand centroid
+_SAND_PROBE_REACH = 24
+_SAND_PROBE_X, _SAND_PROBE_Y = (a.ravel() for a in np.meshgrid(np.arange(-_SAND_PROBE_REACH, _SAND_PROBE_REACH + 1, 6),
+                                                                np.arange(-_SAND_PROBE_REACH, _SAND_PROBE_REACH + 1, 6),
+                                                                indexing="ij"))
 
 
 class HighLevelPlanner:
-    def __init__(self, map_width: int = 640, map_height: int = 640):
+    def __init__(self, map_width: int = 640, map_height: int = 640,
+                 map_loader: Optional[MapLoader] = None):
         self.map_width = map_width
         self.map_height = map_height
         self.surrogate = SurrogatePhysics()
-        self.map_loader = MapLoader()   # real terrain queries if caller doesn't pass a map
+        # real terrain queries if caller doesn't pass a map
+        self.map_loader = map_loader if map_loader is not None else MapLoader()
 
-        # Optimized parameters per shot type
-        self.shot_params = {
-            ShotType.DRIVE: {"angle": 38.0, "power_range": (80, 150)},
-            ShotType.LAYUP: {"angle": 35.0, "power_range": (40, 80)},
-            ShotType.CHIP:  {"angle": 30.0, "power_range": (20, 50)},
-            ShotType.LOB:   {"angle": 75.0, "power_range": (100, 150)},
-            ShotType.PUTT:  {"angle": 5.0,  "power_range": (5, 30)},
-        }
+        # Optimized parameters per shot type, indexed by ShotType: (angle, power_min, power_max)
+        self._params_table = (
+            (38.0, 80, 150),    # DRIVE
+            (35.0, 40, 80),     # LAYUP
+            (30.0, 20, 50),     # CHIP
+            (75.0, 100, 150),   # LOB
+            (5.0,  5, 30),      # PUTT
+        )
+        self._angle_by_shot = tuple(p[0] for p in self._params_table)
 
-    # -------------------------------------------------------------
+        # Distance bands: distance < _range_thresholds[i] -> _range_shots[i]
+        self._range_thresholds = (20.0, 120.0, 200.0)
+        self._range_shots = (ShotType.PUTT, ShotType.CHIP, ShotType.LAYUP, ShotType.DRIVE)
 
-    def _near_sand(self, x: float, y: float, map_loader: MapLoader) -> bool:
-        """Return True if any pixel within ±8px is sand (uses MapLoader)."""
-        if map_loader is None:
-            return False
-        for dx in range(-8, 9):
-            for dy in range(-8, 9):
-                if map_loader.is_sand(x + dx, y + dy):
-                    return True
-        return False
+        self._plan_cache = {}
 
     # -------------------------------------------------------------
 
     def _spiral_find_safe(self, cx: float, cy: float, map_loader: MapLoader,
-                          max_radius: float = 240.0, step: float = 12.0) -> Tuple[float, float]:
+                          max_radius: float = 240.0, step: float = 12.0,
+                          _hypot=math.hypot) -> Tuple[float, float]:
         """
         Spiral search around (cx,cy) to find nearest point that is not sand/hazard.
         Returns a tuple (tx,ty). If none found within max_radius, returns (cx,cy).
@@ -56,30 +140,29 @@ class HighLevelPlanner:
         if map_loader is None:
             return cx, cy
 
-        # concentric rings
-        r = step
-        while r <= max_radius:
-            # sample N points on ring proportional to circumference (clamped)
-            samples = max(8, int(2 * math.pi * r / step))
-            for i in range(samples):
-                a = (i / samples) * 2 * math.pi
-                tx = cx + math.cos(a) * r
-                ty = cy + math.sin(a) * r
-
-                tx = max(20.0, min(self.map_width - 20.0, tx))
-                ty = max(20.0, min(self.map_height - 20.0, ty))
-
-                try:
-                    if not map_loader.is_hazard(tx, ty) and not map_loader.is_sand(tx, ty):
-                        # also ensure short path to that point isn't full of hazards
+        # fast path: walk straight toward the nearest safe cell (precomputed
+        # transform) until the landing point is safe and reachable
+        safe = map_loader.nearest_safe(cx, cy)
+        if safe is not None:
+            ux, uy = safe[0] - cx, safe[1] - cy
+            d = _hypot(ux, uy)
+            if d > 1e-6:
+                ux /= d; uy /= d
+                r = step
+                while r <= max_radius:
+                    tx = max(20.0, min(self.map_width - 20.0, cx + ux * r))
+                    ty = max(20.0, min(self.map_height - 20.0, cy + uy * r))
+                    if not map_loader.is_unsafe(tx, ty):
                         clear, hcount, scount = map_loader.check_path_clear(cx, cy, tx, ty, num_samples=12)
                         if clear:
                             return tx, ty
-                except Exception:
-                    # defensive - continue searching
-                    continue
-            r += step
-        return cx, cy
+                    r += step
+
+        # concentric rings (fallback when the nearest safe cell is walled off)
+        found = map_loader.find_safe_on_rings(cx, cy, max_radius, step,
+                                              20.0, self.map_width - 20.0,
+                                              20.0, self.map_height - 20.0)
+        return found if found is not None else (cx, cy)
 
     # -------------------------------------------------------------
 
@@ -88,27 +171,63 @@ class HighLevelPlanner:
                         terrain_map: Optional[object] = None,   # accept MapLoader instance
                         current_terrain: str = 'fairway',
                         wind_x: float = 0.0, wind_y: float = 0.0,
-                        wind_strength: float = 0.0
-                        ) -> Tuple[str, float, float]:
+                        wind_strength: float = 0.0,
+                        optimizer: Optional[object] = None
+                        ) -> Tuple[ShotType, float, float]:
         """
         Wind-aware high-level planner that uses a MapLoader-like object (terrain_map)
         to avoid sand/hazards and find safe landing zones.
 
-        terrain_map must implement: is_sand(x,y), is_hazard(x,y), check_path_clear(x1,y1,x2,y2)
+        terrain_map must implement: is_sand(x,y), is_hazard(x,y), is_unsafe(x,y), check_path_clear(x1,y1,x2,y2),
+        sand_at(xs,ys), sand_in_box(x0,y0,x1,y1), nearest_safe(x,y), find_safe_on_rings(...),
+        ray_hazard_counts(x1,y1,xs,ys) and build_plan_grid(hx,hy)
+
+        If an optimizer (ShotOptimizer) is passed, the top fan candidates are
+        pre-optimized together and the one it can hit most reliably is chosen.
+
+        Results are memoized on the ball position truncated to whole pixels,
+        wind rounded to 0.1 and the terrain map; a miss plans from the exact
+        inputs.
         """
 
         # choose a map_loader to query
         map_loader = terrain_map if terrain_map is not None else self.map_loader
 
-        dx = hole_x - ball_x
-        dy = hole_y - ball_y
-        distance = math.hypot(dx, dy)
-
-        if distance < 1e-6:
-            return ShotType.PUTT, hole_x, hole_y
+        key = (int(ball_x), int(ball_y), hole_x, hole_y, map_loader, current_terrain,
+               round(wind_x, 1), round(wind_y, 1), round(wind_strength, 1))
+        plan = self._plan_cache.get(key)
+        if plan is None:
+            if len(self._plan_cache) >= PLAN_CACHE_SIZE:
+                self._plan_cache.clear()
+            plan = self._plan_cache[key] = self._plan(
+                ball_x, ball_y, hole_x, hole_y, map_loader,
+                current_terrain, wind_x, wind_y, wind_strength)
+        shot_type, target_x, target_y, refine = plan
+
+        # among the best few safe candidates, prefer the one the optimizer hits
+        # best; run on the caller's exact inputs so its optimize_shot for the
+        # chosen target is answered from the prepared result
+        if optimizer is not None and refine is not None:
+            _, errors = optimizer.optimize_targets(
+                ball_x, ball_y, refine, self.get_angle(ShotType.LAYUP),
+                wind_x, wind_y, wind_strength, current_terrain)
+            target_x, target_y = refine[int(np.argmin(errors))].tolist()
+
+        return shot_type, target_x, target_y
+
+    def _plan(self, ball_x, ball_y, hole_x, hole_y, map_loader,
+              current_terrain, wind_x, wind_y, wind_strength,
+              _hypot=math.hypot):
+        """
+        Uncached plan_strategy without the optimizer pass.
+        Returns (shot_type, x, y, refine): refine holds the layup candidates
+        worth handing to an optimizer (an (n, 2) array), or None.
+        (_hypot is bound at definition time to skip the global+attribute lookup.)
+        """
 
         # =====================================================
         #  If ball currently in sand -> escape mode (priority)
+        #  (checked first: the escape never needs the hole distance)
         # =====================================================
         if current_terrain == "sand" or (map_loader is not None and map_loader.is_sand(ball_x, ball_y)):
             shot_type = ShotType.LOB
@@ -116,16 +235,18 @@ class HighLevelPlanner:
             # compute local sand centroid to push away from cluster
             sx = sy = 0.0
             count = 0
-            if map_loader is not None:
-                for ox in range(-24, 25, 6):
-                    for oy in range(-24, 25, 6):
-                        tx = ball_x + ox
-                        ty = ball_y + oy
-                        try:
-                            if map_loader.is_sand(tx, ty):
-                                sx += tx; sy += ty; count += 1
-                        except Exception:
-                            pass
+            # one summed-area query first: no sand anywhere under the probe
+            # window means no probe can hit, so skip the 81-point gather
+            reach = _SAND_PROBE_REACH
+            if map_loader is not None and map_loader.sand_in_box(ball_x - reach, ball_y - reach,
+                                                                 ball_x + reach, ball_y + reach):
+                probe_x = ball_x + _SAND_PROBE_X
+                probe_y = ball_y + _SAND_PROBE_Y
+                hits = map_loader.sand_at(probe_x, probe_y)
+                count = int(np.count_nonzero(hits))
+                if count:
+                    sx = float(probe_x[hits].sum())
+                    sy = float(probe_y[hits].sum())
 
             if count > 0:
                 cx = sx / count
@@ -133,23 +254,23 @@ class HighLevelPlanner:
                 # prefer direction away from sand centroid
                 ex = ball_x - cx
                 ey = ball_y - cy
-                ed = math.hypot(ex, ey)
+                ed = _hypot(ex, ey)
                 if ed < 1e-6:
                     # degenerate: nudge toward map center as fallback
                     ex, ey = (self.map_width/2 - ball_x), (self.map_height/2 - ball_y)
-                    ed = math.hypot(ex, ey) or 1.0
+                    ed = _hypot(ex, ey) or 1.0
                 ex /= ed; ey /= ed
 
                 # Slightly bias away from wind if wind would push into sand centroid
                 wind_dot = wind_x * (cx - ball_x) + wind_y * (cy - ball_y)
-                wind_mag = math.hypot(wind_x, wind_y)
+                wind_mag = _hypot(wind_x, wind_y)
                 upwind_bias = 0.0
                 if wind_mag > 8.0 and wind_dot > 0.0:
                     upwind_bias = -0.35  # push opposite the wind that pushes back to sand
 
                 bx = ex + upwind_bias * wind_x
                 by = ey + upwind_bias * wind_y
-                bd = math.hypot(bx, by)
+                bd = _hypot(bx, by)
                 if bd < 1e-6:
                     bx, by = ex, ey
                 else:
@@ -166,28 +287,29 @@ class HighLevelPlanner:
 
                 # If landing point is still sand/hazard, spiral-search for nearest safe spot
                 try:
-                    if map_loader is not None and (map_loader.is_sand(target_x, target_y) or map_loader.is_hazard(target_x, target_y)):
+                    if map_loader is not None and map_loader.is_unsafe(target_x, target_y):
                         target_x, target_y = self._spiral_find_safe(target_x, target_y, map_loader,
                                                                    max_radius=220.0, step=14.0)
                 except Exception:
                     # defensive: if queries fail just return hole as fallback
-                    return shot_type, hole_x, hole_y
+                    return shot_type, hole_x, hole_y, None
 
-                print("  🏖️ SAND ESCAPE (map-aware): aiming for safe fairway")
-                return shot_type, target_x, target_y
+                logger.debug("  🏖️ SAND ESCAPE (map-aware): aiming for safe fairway")
+                return shot_type, target_x, target_y, None
 
             # fallback - no local sand found: lob to hole (rare)
-            return shot_type, hole_x, hole_y
+            return shot_type, hole_x, hole_y, None
+
+        distance = _hypot(hole_x - ball_x, hole_y - ball_y)
+        if distance < 1e-6:
+            return ShotType.PUTT, hole_x, hole_y, None
 
         # =====================================================
         #  Short-range rules
         # =====================================================
-        if distance < 20:
-            return ShotType.PUTT, hole_x, hole_y
-        if distance < 120:
-            return ShotType.CHIP, hole_x, hole_y
-        if distance < 200:
-            return ShotType.LAYUP, hole_x, hole_y
+        shot_type = self._range_shots[bisect.bisect_right(self._range_thresholds, distance)]
+        if shot_type != ShotType.DRIVE:
+            return shot_type, hole_x, hole_y, None
 
         # =====================================================
         #  Long-range: handle high wind and candidate search
@@ -204,32 +326,38 @@ class HighLevelPlanner:
             try:
                 clear, hazards, sands = map_loader.check_path_clear(ball_x, ball_y, drive_target_x, drive_target_y)
                 if clear and not very_strong_wind:
-                    return ShotType.DRIVE, drive_target_x, drive_target_y
+                    return ShotType.DRIVE, drive_target_x, drive_target_y, None
             except Exception:
                 # if check fails, continue to candidate search
                 pass
 
         # Candidate search:
         fan_candidates = 16 if very_strong_wind else (12 if strong_wind else 8)
-        candidates = self.search_landing_zones(ball_x, ball_y, hole_x, hole_y,
-                                               map_loader=map_loader, num_candidates=fan_candidates)
+        cand_x, cand_y, cand_scores = self.search_landing_zones(ball_x, ball_y, hole_x, hole_y,
+                                                                map_loader=map_loader,
+                                                                num_candidates=fan_candidates)
 
-        if candidates:
-            best_x, best_y, score = candidates[0]
+        if cand_scores.size:
+            best_x, best_y = float(cand_x[0]), float(cand_y[0])
             # if the best candidate is still a risky area, and wind is very strong, fallback to a safer close layup
+            # (its score already says so: only sand/hazard landings reach LANDING_SAND_PENALTY)
             try:
-                if map_loader is not None and (map_loader.is_sand(best_x, best_y) or map_loader.is_hazard(best_x, best_y)):
+                if cand_scores[0] >= LANDING_SAND_PENALTY:
                     # try to find safe spot near ball
                     safe_x, safe_y = self._spiral_find_safe(ball_x, ball_y, map_loader, max_radius=160.0, step=12.0)
-                    return ShotType.LAYUP, safe_x, safe_y
+                    return ShotType.LAYUP, safe_x, safe_y, None
             except Exception:
                 pass
 
-            print("  🌬️ Selecting safer landing zone")
-            return ShotType.LAYUP, best_x, best_y
+            # the best few safe candidates, for plan_strategy's optimizer pass
+            safe = cand_scores[:REFINE_TOP_K] < LANDING_SAND_PENALTY
+            top = np.column_stack([cand_x[:REFINE_TOP_K][safe], cand_y[:REFINE_TOP_K][safe]])
+
+            logger.debug("  🌬️ Selecting safer landing zone")
+            return ShotType.LAYUP, best_x, best_y, (top if len(top) > 1 else None)
 
         # fallback: direct drive waypoint
-        return ShotType.DRIVE, drive_target_x, drive_target_y
+        return ShotType.DRIVE, drive_target_x, drive_target_y, None
 
     # -------------------------------------------------------------
 
@@ -237,82 +365,61 @@ class HighLevelPlanner:
                        hole_x: float, hole_y: float,
                        distance: float) -> Tuple[float, float]:
         """Drive toward hole, but cap at ~250px."""
-        max_shot = 250.0
-
-        if distance > max_shot:
-            dir_x = (hole_x - ball_x) / distance
-            dir_y = (hole_y - ball_y) / distance
-
-            wx = ball_x + dir_x * max_shot
-            wy = ball_y + dir_y * max_shot
-
-            wx = max(20, min(self.map_width - 20, wx))
-            wy = max(20, min(self.map_height - 20, wy))
-
-            return wx, wy
-
-        return hole_x, hole_y
+        return _waypoint_njit(float(ball_x), float(ball_y), float(hole_x), float(hole_y),
+                              float(distance), float(self.map_width), float(self.map_height), 250.0)
 
     # -------------------------------------------------------------
 
     def search_landing_zones(self, ball_x: float, ball_y: float,
                                 hole_x: float, hole_y: float,
                                 map_loader,
-                                num_candidates: int = 8) -> List[Tuple[float, float, float]]:
+                                num_candidates: int = 8) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
         """
-        Generate candidate landing zones in a fan and score with map_loader + surrogate.
-        Returns list of (x,y,score) sorted ascending (lower better).
+        Generate candidate landing zones in a fan and score them on map_loader's plan grid.
+        Returns parallel arrays (xs, ys, scores) sorted by score ascending (lower better).
+        Candidates with FAN_MAX_RAY_HAZARDS or more hazard samples along their
+        flight line are left out (a single water sample is tolerated). If that
+        leaves none, the fan is retried with FAN_WIDE_CANDIDATES rays; a wide
+        fan that is still fully blocked keeps all of its candidates.
         """
         if map_loader is None:
             map_loader = self.map_loader
 
-        distance = math.hypot(hole_x - ball_x, hole_y - ball_y)
-        base_angle = math.atan2(hole_y - ball_y, hole_x - ball_x)
-
-        candidates = []
-        for i in range(num_candidates):
-            angle_offset = (i - (num_candidates - 1)/2) * (0.2)  # roughly ±20 degrees fan
-            angle = base_angle + angle_offset
-
-            dist_factor = 0.75 + (i / max(1, num_candidates)) * 0.25
-            target_dist = min(distance, 250.0) * dist_factor
-
-            tx = ball_x + math.cos(angle) * target_dist
-            ty = ball_y + math.sin(angle) * target_dist
-
-            tx = max(20.0, min(self.map_width - 20.0, tx))
-            ty = max(20.0, min(self.map_height - 20.0, ty))
-
-            # Hard-reject hazards
-            try:
-                if map_loader.is_hazard(tx, ty):
-                    score = 1e6
-                elif map_loader.is_sand(tx, ty):
-                    # big penalty but not absolute reject (we may still choose if nothing else)
-                    score = 5e4 + target_dist
-                else:
-                    # surrogate score: prefer closer to hole and stable landings
-                    score = self.surrogate.evaluate_landing_zone(tx, ty, hole_x, hole_y, 'fairway')
-                    # soft penalty for proximity to sand
-                    near_sand = False
-                    for dx in range(-12, 13, 4):
-                        for dy in range(-12, 13, 4):
-                            if map_loader.is_sand(tx + dx, ty + dy):
-                                near_sand = True
-                                break
-                        if near_sand:
-                            break
-                    if near_sand:
-                        score += 400.0
-            except Exception:
-                score = self.surrogate.evaluate_landing_zone(tx, ty, hole_x, hole_y, 'fairway')
-
-            candidates.append((tx, ty, score))
-
-        candidates.sort(key=lambda x: x[2])
-        return candidates
+        table = _FAN_TABLES.get(num_candidates)
+        if table is None:
+            table = _FAN_TABLES[num_candidates] = _fan_table(num_candidates)
+        txs, tys, target_dists = _fan_njit(float(ball_x), float(ball_y), float(hole_x), float(hole_y),
+                                           *table, float(self.map_width), float(self.map_height))
+
+        # drop rays with too many hazard samples before scoring; if the whole fan
+        # has them, widen it
+        viable = map_loader.ray_hazard_counts(ball_x, ball_y, txs, tys) < FAN_MAX_RAY_HAZARDS
+        if not viable.any():
+            if num_candidates < FAN_WIDE_CANDIDATES:
+                return self.search_landing_zones(ball_x, ball_y, hole_x, hole_y,
+                                                 map_loader, FAN_WIDE_CANDIDATES)
+        elif not viable.all():
+            txs, tys, target_dists = txs[viable], tys[viable], target_dists[viable]
+
+        # per-pixel landing score for this hole (terrain penalty + distance to
+        # hole, built once per hole): hazards are hard-rejected and sand also
+        # pays the shot distance
+        grid = map_loader.build_plan_grid(hole_x, hole_y)
+        h, w = grid.shape
+        scores = grid[np.clip(tys.astype(np.intp), 0, h - 1),
+                      np.clip(txs.astype(np.intp), 0, w - 1)].astype(np.float64)
+        sand = scores == LANDING_SAND_PENALTY
+        scores[sand] += target_dists[sand]
+
+        order = np.argsort(scores, kind="stable")
+        return txs[order], tys[order], scores[order]
 
     # -------------------------------------------------------------
 
-    def get_shot_parameters(self, shot_type: str):
-        return self.shot_params.get(shot_type, self.shot_params[ShotType.LAYUP])
+    def get_shot_parameters(self, shot_type: ShotType) -> Tuple[float, int, int]:
+        """Return (angle, power_min, power_max) for a shot type."""
+        return self._params_table[shot_type]
+
+    def get_angle(self, shot_type: ShotType) -> float:
+        """Launch-angle hint for a shot type."""
+        return self._angle_by_shot[shot_type]
@@ -4,17 +4,93 @@ Low-Level Optimizer - Wind-aware CMA-ES based shot parameter optimization
 Robust, hazard-penalizing, stable optimizer for your golf AI.
 """
 
+import bisect
+import logging
 import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 from typing import Tuple
+from numba_compat import NUMBA_AVAILABLE
 from surrogate_physics import SurrogatePhysics
 
+logger = logging.getLogger(__name__)
+
+# storage precision of the CMA-ES search state (mean, sigma, noise, population);
+# positions are pixels on a 640px map, so single precision is plenty. The
+# physics kernels still integrate in float64: each shot is one serial chain
+# of dependent steps, which float32 does not shorten (measured no faster)
+_DTYPE = np.float32
+
+# robust evaluation: wind samples per candidate, their spread, variance weight
+WIND_SAMPLES = 5
+WIND_NOISE = 0.15
+VARIANCE_WEIGHT = 6.0
+
+# per-sample penalty when the shot is played from these terrains
+TERRAIN_HIT_PENALTY = {"sand": 2000.0, "water": 5000.0}
+
+# Without numba the population is scored by the single-threaded NumPy
+# integrator; populations at least this large are split across a process
+# pool (smaller ones cost less than the round-trip). With numba the kernel
+# already spreads the population over every core, so no pool is used.
+POOL_MIN_CANDIDATES = 64
+POOL_WORKERS = os.cpu_count() or 1
+
+# lies the quick_optimize safety guards treat as unsafe when no map is given
+_UNSAFE_LIES = frozenset(("sand", "water"))
+
+# CMA-ES early stop: miss floor (px), fraction of the shot length, sigma norm
+STOP_ERROR = 4.0
+STOP_ERROR_PER_PX = 0.015
+STOP_SIGMA = 0.05
+
+# CMA-ES warm start: a run whose shot direction (rad) and length (px) are this
+# close to the last solved shot starts from a blend of its final mean/sigma
+# (WARM_MEAN_SHARE / WARM_SIGMA_SHARE of the old state). A warm run whose
+# first generation already misses by less than WARM_BASIN_ERROR is in the
+# basin and may stop at WARM_STOP_ERROR.
+WARM_DIR = 0.5
+WARM_DISTANCE = 40.0
+WARM_MEAN_SHARE = 0.3
+WARM_SIGMA_SHARE = 0.25
+WARM_BASIN_ERROR = 10.0
+WARM_STOP_ERROR = 8.0
+
+# quick_optimize distance ladder: band upper bounds (px), then per band the
+# power per px of distance and the launch angle (power capped at 150)
+_DIST_BINS = (10.0, 20.0, 40.0, 70.0, 120.0, 200.0)
+_POWER_PER_PX = (0.3, 0.35, 0.45, 0.6, 0.85, 0.75, 0.55)
+_LAUNCH_ANGLE = (2.0, 5.0, 10.0, 18.0, 28.0, 35.0, 38.0)
+
+
+_worker_surrogate = SurrogatePhysics()
+
+
+def _robust_score_worker(args):
+    """Pool worker: SurrogatePhysics.robust_score_batch on one chunk of candidates."""
+    return _worker_surrogate.robust_score_batch(*args)
+
 
 class ShotOptimizer:
-    def __init__(self):
+    def __init__(self, map_loader=None, seed=None):
         self.surrogate = SurrogatePhysics()
+        self.map_loader = map_loader             # terrain for the quick_optimize safety guards
+        self.rng = np.random.default_rng(seed)   # every noise draw; seed for reproducible runs
         self.max_evaluations = 200       # CMA-ES budget
         self.population_size = 20        # CMA-ES population
+        self._prepared = {}              # optimize_targets results by shot key
+        self._last_shot = None           # (direction, length) of the last solved shot
+        self._last_mean = None           # and its final CMA-ES mean/sigma
+        self._last_sigma = None
+        self._pool = None                # scoring ProcessPoolExecutor, created on first use
+
+    def close(self):
+        """Shut down the scoring process pool, if one was started."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
 
     # ----------------------------------------------------------------------
     #   PUBLIC API
@@ -36,23 +112,27 @@ class ShotOptimizer:
         if distance < 1e-6:
             return 0.0, -1.0, 45.0, 0.0, 0.0, 0.0
 
-        init_dirx = dx / distance
-        init_diry = dy / distance
-        init_power = min(distance / 8.0, 150.0)
-
-        best_params, best_score = self._cmaes_optimize(
-            ball_x, ball_y, target_x, target_y,
-            init_dirx, init_diry, angle_hint, init_power,
-            wind_x, wind_y, wind_strength, terrain
-        )
+        # already solved by optimize_targets for this exact shot?
+        prepared = self._prepared.pop(
+            (ball_x, ball_y, target_x, target_y, angle_hint, wind_x, wind_y, wind_strength, terrain), None)
+        if prepared is not None:
+            best_params, best_score = prepared
+        else:
+            init_dirx = dx / distance
+            init_diry = dy / distance
+            init_power = min(distance / 8.0, 150.0)
+
+            best_params, best_score = self._cmaes_optimize(
+                ball_x, ball_y, target_x, target_y,
+                init_dirx, init_diry, angle_hint, init_power,
+                wind_x, wind_y, wind_strength, terrain
+            )
 
         dirx, diry, angle, power, spinx, spiny = best_params
 
-        print(
-            f"  CMA-ES: dist={distance:.1f} "
-            f"angle={angle:.1f}° power={power:.1f} "
-            f"error={best_score:.1f}"
-        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("  CMA-ES: dist=%.1f angle=%.1f° power=%.1f error=%.1f",
+                         distance, angle, power, best_score)
 
         return dirx, diry, angle, power, spinx, spiny
 
@@ -64,121 +144,204 @@ class ShotOptimizer:
                         init_dirx, init_diry, init_angle, init_power,
                         wind_x, wind_y, wind_strength, terrain):
 
-        init_dir_angle = math.atan2(init_diry, init_dirx)
+        params, scores = self._cmaes_optimize_many(
+            ball_x, ball_y, target_x, target_y,
+            init_dirx, init_diry, init_angle, init_power,
+            wind_x, wind_y, wind_strength, terrain
+        )
+        return params[0], float(scores[0])
 
-        mean = np.array([
-            init_dir_angle,    # 0 direction (radians)
-            init_angle,        # 1 launch angle (degrees)
-            init_power,        # 2 power
-            0.0,               # 3 spinx
-            0.0                # 4 spiny
-        ], dtype=float)
+    def _cmaes_optimize_many(self, ball_x, ball_y, target_x, target_y,
+                             init_dirx, init_diry, init_angle, init_power,
+                             wind_x, wind_y, wind_strength, terrain):
+        """
+        Independent CMA-ES runs toward k targets (target/init args are scalars
+        or length-k arrays), advanced in lockstep so every generation of every
+        run is a single batched evaluation. Returns ((k, 6) params, (k,) scores).
+        """
+        target_x, target_y, init_dirx, init_diry, init_angle, init_power = np.broadcast_arrays(
+            *(np.atleast_1d(np.asarray(a, dtype=float)) for a in
+              (target_x, target_y, init_dirx, init_diry, init_angle, init_power)))
+        k = target_x.shape[0]
+        pop = self.population_size
+
+        mean = np.column_stack([
+            np.arctan2(init_diry, init_dirx),   # 0 direction (radians)
+            init_angle,                         # 1 launch angle (degrees)
+            init_power,                         # 2 power
+            np.zeros(k),                        # 3 spinx
+            np.zeros(k)                         # 4 spiny
+        ]).astype(_DTYPE)
+
+        sigma = np.tile(np.array([0.25, 8.0, 20.0, 1.5, 1.5], dtype=_DTYPE), (k, 1))
+
+        # warm start runs that resemble the last solved shot
+        shot_dir = mean[:, 0].astype(float)
+        shot_len = np.hypot(target_x - ball_x, target_y - ball_y)
+        warm = np.zeros(k, dtype=bool)
+        if self._last_shot is not None:
+            last_dir, last_len = self._last_shot
+            last_mean = self._last_mean
+            warm = ((np.abs((last_dir - shot_dir + np.pi) % (2 * np.pi) - np.pi) < WARM_DIR)
+                    & (np.abs(shot_len - last_len) < WARM_DISTANCE))
+            turn = (last_mean[0] - mean[:, 0] + np.pi) % (2 * np.pi) - np.pi
+            mean[warm, 0] += WARM_MEAN_SHARE * turn[warm]
+            mean[warm, 1:] += WARM_MEAN_SHARE * (last_mean[1:] - mean[warm, 1:])
+            sigma[warm] += WARM_SIGMA_SHARE * (self._last_sigma - sigma[warm])
+
+        best_params = mean.astype(np.float64)
+        best_score = np.full(k, np.inf)
 
-        sigma = np.array([0.25, 8.0, 20.0, 1.5, 1.5], dtype=float)
+        # number of generations
+        gens = max(1, self.max_evaluations // pop)
+        n_elite = max(1, pop // 2)
 
-        best_params = mean.copy()
-        best_score = float("inf")
+        # all step and wind noise for the whole search, drawn in one go
+        step_noise = self.rng.standard_normal((gens, k, pop, 5), dtype=_DTYPE)
+        wind_noise = self.rng.standard_normal((gens, k, pop, WIND_SAMPLES, 2), dtype=_DTYPE)
 
-        # number of generations
-        gens = max(1, self.max_evaluations // self.population_size)
+        # early-stop error per run: STOP_ERROR, or STOP_ERROR_PER_PX of the shot
+        # length for long shots, where a few px of miss is as good as it gets
+        stop_error = np.maximum(STOP_ERROR, STOP_ERROR_PER_PX * np.hypot(target_x - ball_x, target_y - ball_y))
 
-        for gen in range(gens):
+        # runs that have not converged yet, and their per-candidate targets
+        active = np.arange(k)
+        pop_target_x = np.repeat(target_x, pop)
+        pop_target_y = np.repeat(target_y, pop)
 
-            population = []
-            scores = []
+        # one (runs, population, 5) block per generation, refilled in place
+        population_buf = np.empty((k, pop, 5), dtype=_DTYPE)
 
-            for _ in range(self.population_size):
-                cand = mean + sigma * np.random.randn(5)
+        for gen in range(gens):
+            m = active.shape[0]
+            rows = np.arange(m)
 
-                # clamp sensible ranges
-                cand[1] = np.clip(cand[1], 0.0, 75.0)    # angle degrees
-                cand[2] = np.clip(cand[2], 5.0, 150.0)   # power
-                cand[3] = np.clip(cand[3], -10.0, 10.0)  # spinx
-                cand[4] = np.clip(cand[4], -10.0, 10.0)  # spiny
+            population = population_buf[:m]
+            np.multiply(sigma[active, None, :], step_noise[gen, active], out=population)
+            population += mean[active, None, :]
 
-                score = self._evaluate_shot(
-                    ball_x, ball_y, target_x, target_y,
-                    cand, wind_x, wind_y, wind_strength, terrain
-                )
+            # clamp sensible ranges
+            np.clip(population[:, :, 1], 0.0, 75.0, out=population[:, :, 1])      # angle degrees
+            np.clip(population[:, :, 2], 5.0, 150.0, out=population[:, :, 2])     # power
+            np.clip(population[:, :, 3:], -10.0, 10.0, out=population[:, :, 3:])  # spinx, spiny
 
-                population.append(cand)
-                scores.append(score)
+            scores = self._score_population(
+                ball_x, ball_y,
+                pop_target_x, pop_target_y,
+                population.reshape(m * pop, 5), wind_x, wind_y, wind_strength, terrain,
+                noise=wind_noise[gen, active].reshape(m * pop, WIND_SAMPLES, 2)
+            ).reshape(m, pop)
 
-                if score < best_score:
-                    best_score = score
-                    best_params = cand.copy()
+            i = scores.argmin(axis=1)
+            improved = scores[rows, i] < best_score[active]
+            best_score[active[improved]] = scores[rows, i][improved]
+            best_params[active[improved]] = population[rows[improved], i[improved]]
 
-            # keep best 50% as elite
-            elite_idx = np.argsort(scores)[: max(1, self.population_size // 2)]
-            mean = np.mean([population[i] for i in elite_idx], axis=0)
+            if gen == 0:
+                basin = warm & (best_score < WARM_BASIN_ERROR)
+                stop_error[basin] = np.maximum(stop_error[basin], WARM_STOP_ERROR)
 
-            # shrink exploration
-            sigma *= 0.92
+            # keep best 50% as elite (partitioned, not sorted: order is unused)
+            elite_idx = np.argpartition(scores, n_elite - 1, axis=1)[:, :n_elite]
+            elite_scores = np.take_along_axis(scores, elite_idx, axis=1)
+            mean[active] = np.take_along_axis(population, elite_idx[:, :, None], axis=1).mean(axis=1)
 
-            # early stop
-            if best_score < 4.0:
-                break
+            # shrink exploration
+            sigma[active] *= 0.92
+
+            # early stop: accurate enough, step size collapsed, or the elite
+            # all score the same (clamped into one corner of the box)
+            done = ((best_score[active] < stop_error[active])
+                    | (np.linalg.norm(sigma[active], axis=1) < STOP_SIGMA)
+                    | (elite_scores.max(axis=1) == elite_scores.min(axis=1)))
+            if done.any():
+                active = active[~done]
+                if active.shape[0] == 0:
+                    break
+                pop_target_x = np.repeat(target_x[active], pop)
+                pop_target_y = np.repeat(target_y[active], pop)
+
+        # the best run's final state seeds the next search
+        b = best_score.argmin()
+        self._last_shot = (shot_dir[b], shot_len[b])
+        self._last_mean = mean[b].copy()
+        self._last_sigma = sigma[b].copy()
 
         # convert best params to output format
-        dir_angle = best_params[0]
-        dirx = math.cos(dir_angle)
-        diry = math.sin(dir_angle)
-        return (
-            np.array([dirx, diry, best_params[1], best_params[2], best_params[3], best_params[4]], dtype=float),
-            best_score
+        dir_angle = best_params[:, 0]
+        params = np.column_stack([np.cos(dir_angle), np.sin(dir_angle), best_params[:, 1:]])
+        return params, best_score
+
+    def optimize_targets(self, ball_x, ball_y, targets, angle_hint=45.0,
+                         wind_x=0.0, wind_y=0.0, wind_strength=0.0, terrain='fairway'):
+        """
+        CMA-ES toward several candidate targets at once. Returns the list of
+        (dirx, diry, angle, power, spinx, spiny) and the array of robust errors,
+        in target order. Results are kept so a following optimize_shot for one
+        of these targets (same ball, hint, wind and terrain) is answered directly.
+        """
+        targets = np.asarray(targets, dtype=float).reshape(-1, 2)
+        dx = targets[:, 0] - ball_x
+        dy = targets[:, 1] - ball_y
+        distance = np.maximum(np.hypot(dx, dy), 1e-6)
+
+        params, scores = self._cmaes_optimize_many(
+            ball_x, ball_y, targets[:, 0], targets[:, 1],
+            dx / distance, dy / distance, angle_hint, np.minimum(distance / 8.0, 150.0),
+            wind_x, wind_y, wind_strength, terrain
         )
 
+        shots = [tuple(p) for p in params.tolist()]
+        self._prepared = {
+            (ball_x, ball_y, tx, ty, angle_hint, wind_x, wind_y, wind_strength, terrain): (shot, score)
+            for (tx, ty), shot, score in zip(targets.tolist(), shots, scores.tolist())
+        }
+        return shots, scores
+
     # ----------------------------------------------------------------------
     #   SHOT EVALUATION (ROBUST, MULTI-SAMPLE, HAZARD-PENALIZING)
     # ----------------------------------------------------------------------
 
-    def _evaluate_shot(self, ball_x, ball_y, target_x, target_y,
-                       params, wind_x, wind_y, wind_strength, terrain):
-
-        dir_ang = float(params[0])
-        dirx = math.cos(dir_ang)
-        diry = math.sin(dir_ang)
-        angle = float(params[1])
-        power = float(params[2])
-        spinx = float(params[3])
-        spiny = float(params[4])
-
-        K = 5  # wind samples (trade-off accuracy vs cost)
-        errors = []
-        sand_hits = 0
-        water_hits = 0
+    def _score_population(self, ball_x, ball_y, target_x, target_y,
+                          population, wind_x, wind_y, wind_strength, terrain, noise=None):
+        """
+        Robust score per row of population (n x 5), aimed at the scalar or
+        per-row target: mean + VARIANCE_WEIGHT *
+        variance of the miss over WIND_SAMPLES noisy winds, plus the terrain
+        penalty. All n * WIND_SAMPLES shots and the per-candidate reduction run in
+        one robust_score_batch call.
+        noise: optional pre-drawn (n, WIND_SAMPLES, 2) standard normals.
+        """
+        n = population.shape[0]
+        if noise is None:
+            noise = self.rng.standard_normal((n, WIND_SAMPLES, 2))
 
-        for _ in range(K):
-            wx = wind_x + np.random.randn() * 0.15 * wind_strength
-            wy = wind_y + np.random.randn() * 0.15 * wind_strength
+        hit_penalty = TERRAIN_HIT_PENALTY.get(terrain, 0.0) * WIND_SAMPLES
+        winds_x = wind_x + noise[:, :, 0] * WIND_NOISE * wind_strength
+        winds_y = wind_y + noise[:, :, 1] * WIND_NOISE * wind_strength
 
-            final_x, final_y, meta = self.surrogate.simulate_shot(
+        if NUMBA_AVAILABLE or POOL_WORKERS < 2 or n < POOL_MIN_CANDIDATES:
+            return self.surrogate.robust_score_batch(
                 ball_x, ball_y,
-                dirx, diry,
-                angle, power,
-                wx, wy, wind_strength,
-                spinx, spiny,
-                terrain
-            )
-
-            err = math.hypot(final_x - target_x, final_y - target_y)
-            errors.append(err)
-
-            # hazards detection using meta dict (surrogate must return meta)
-            if isinstance(meta, dict):
-                t = meta.get("terrain", None)
-                if t == "sand":
-                    sand_hits += 1
-                if t == "water":
-                    water_hits += 1
-
-        mean_error = float(np.mean(errors))
-        var_penalty = float(np.var(errors)) * 6.0
-
-        sand_penalty = sand_hits * 2000.0
-        water_penalty = water_hits * 5000.0
-
-        return mean_error + var_penalty + sand_penalty + water_penalty
+                population[:, 0], population[:, 1], population[:, 2],
+                population[:, 3], population[:, 4],
+                winds_x, winds_y, wind_strength, target_x, target_y, terrain,
+                VARIANCE_WEIGHT
+            ) + hit_penalty
+
+        # one contiguous slice of the candidates per worker
+        if self._pool is None:
+            # spawn: the caller may already run threads, which fork would copy mid-state
+            self._pool = ProcessPoolExecutor(max_workers=POOL_WORKERS,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        target_x = np.broadcast_to(target_x, (n,))
+        target_y = np.broadcast_to(target_y, (n,))
+        bounds = np.linspace(0, n, POOL_WORKERS + 1).astype(int)
+        chunks = [(ball_x, ball_y, *population[lo:hi].T,
+                   winds_x[lo:hi], winds_y[lo:hi], wind_strength,
+                   target_x[lo:hi], target_y[lo:hi], terrain, VARIANCE_WEIGHT)
+                  for lo, hi in zip(bounds[:-1], bounds[1:])]
+        return np.concatenate(list(self._pool.map(_robust_score_worker, chunks))) + hit_penalty
 
     # ----------------------------------------------------------------------
     #   FAST MODE: DRIFT-COMPENSATION
@@ -229,49 +392,29 @@ class ShotOptimizer:
                 ndx = cdx / cd
                 ndy = cdy / cd
 
-                # SAFETY GUARD 1: if wind pushes compensation TOWARD sand/hazard → reject drift
-                unsafe = False
-                for t in np.linspace(0, 1, 6):
-                    sx = ball_x + ndx * cd * t
-                    sy = ball_y + ndy * cd * t
-                    # use a realistic simulate_shot check from that intermediate point
-                    fx, fy, meta = self.surrogate.simulate_shot(
-                        sx, sy,
-                        ndx, ndy,
-                        angle, power,
-                        wind_x, wind_y, wind_strength,
-                        0.0, 0.0,
-                        terrain
-                    )
-                    if isinstance(meta, dict) and (meta.get("terrain") in ("sand", "water")):
-                        unsafe = True
-                        break
+                # SAFETY GUARD 1: if wind pushes compensation TOWARD sand/hazard → reject drift.
+                # The ball starts in the bunker and lobs out of it, so only water
+                # on the line or an unsafe landing spot count against it
+                if self.map_loader is None:
+                    unsafe = terrain in _UNSAFE_LIES
+                else:
+                    _, hazards, _ = self.map_loader.check_path_clear(
+                        ball_x, ball_y, comp_tx, comp_ty, num_samples=6)
+                    unsafe = hazards > 0 or self.map_loader.is_unsafe(comp_tx, comp_ty)
 
                 if not unsafe:
                     dirx, diry = ndx, ndy  # safe to use wind-corrected direction
 
-            print("    💥 SAFE SAND ESCAPE")
+            logger.debug("    💥 SAFE SAND ESCAPE")
             return dirx, diry, angle, power
 
         # ------------------------------------------------------------------
         # NORMAL SHOTS
         # ------------------------------------------------------------------
         # basic distance-based parameters
-        if distance < 10:
-            power = distance * 0.3; angle = 2.0
-        elif distance < 20:
-            power = distance * 0.35; angle = 5.0
-        elif distance < 40:
-            power = distance * 0.45; angle = 10.0
-        elif distance < 70:
-            power = distance * 0.6; angle = 18.0
-        elif distance < 120:
-            power = distance * 0.85; angle = 28.0
-        elif distance < 200:
-            power = distance * 0.75; angle = 35.0
-        else:
-            power = min(distance * 0.55, 150.0)
-            angle = 38.0
+        band = bisect.bisect_right(_DIST_BINS, distance)
+        power = min(distance * _POWER_PER_PX[band], 150.0)
+        angle = _LAUNCH_ANGLE[band]
 
         dirx = dx / distance
         diry = dy / distance
@@ -302,26 +445,17 @@ class ShotOptimizer:
                 ndy = cdy / cd
 
                 # SAFETY GUARD 2: ensure compensated direction does NOT cross sand
-                safe = True
-                for t in np.linspace(0, 1, 8):
-                    sx = ball_x + ndx * cd * t
-                    sy = ball_y + ndy * cd * t
-                    fx, fy, meta = self.surrogate.simulate_shot(
-                        sx, sy,
-                        ndx, ndy,
-                        angle, power,
-                        wind_x, wind_y, wind_strength,
-                        0.0, 0.0,
-                        terrain
-                    )
-                    if isinstance(meta, dict) and (meta.get("terrain") in ("sand", "water")):
-                        safe = False
-                        break
+                if self.map_loader is None:
+                    safe = terrain not in _UNSAFE_LIES
+                else:
+                    _, hazards, sands = self.map_loader.check_path_clear(
+                        ball_x, ball_y, comp_tx, comp_ty, num_samples=8)
+                    safe = hazards == 0 and sands == 0
 
                 if safe:
                     dirx, diry = ndx, ndy
 
-            print("    🌬️ SAFE WIND COMPENSATION")
+            logger.debug("    🌬️ SAFE WIND COMPENSATION")
 
         return dirx, diry, angle, power
 
@@ -337,23 +471,23 @@ class ShotOptimizer:
         if target_x is None or target_y is None:
             raise ValueError("target_x and target_y must be provided.")
 
-        drifts = []
-
-        for _ in range(samples):
-            wx = wind_x + np.random.randn() * 0.2 * wind_strength
-            wy = wind_y + np.random.randn() * 0.2 * wind_strength
-
+        # all noisy winds drawn at once; a handful of samples is flown one by
+        # one on the serial kernel (no parallel launch from the caller's thread)
+        noise = self.rng.standard_normal((samples, 2)) * 0.2 * wind_strength
+        sum_x = sum_y = 0.0
+        for nx, ny in noise.tolist():
             fx, fy, meta = self.surrogate.simulate_shot(
                 ball_x, ball_y,
                 dirx, diry,
                 angle, power,
-                wx, wy, wind_strength,
+                wind_x + nx, wind_y + ny, wind_strength,
                 0.0, 0.0,
                 terrain
             )
-            drifts.append((fx - target_x, fy - target_y))
+            sum_x += fx
+            sum_y += fy
 
-        avg_dx = sum(d[0] for d in drifts) / samples
-        avg_dy = sum(d[1] for d in drifts) / samples
+        avg_dx = sum_x / samples - target_x
+        avg_dy = sum_y / samples - target_y
 
         return avg_dx, avg_dy
@@ -1,8 +1,172 @@
 """
 Map Loader - Load and analyze golf course terrain
 """
+import math
+from functools import lru_cache
 from PIL import Image
 import numpy as np
+from numba_compat import njit, NUMBA_AVAILABLE
+
+# Occupancy grid bits (MapLoader._occ)
+OCC_HAZARD = 1
+OCC_SAND = 2
+
+# check_path_clear_cached snaps endpoints to this grid (px) and memoizes
+PATH_CACHE_QUANTUM = 8
+PATH_CACHE_SIZE = 4096
+
+# Terrain penalties baked into MapLoader.landing_score_grid
+LANDING_HAZARD_PENALTY = 1e6
+LANDING_SAND_PENALTY = 5e4
+LANDING_NEAR_SAND_PENALTY = 400.0
+LANDING_NEAR_SAND_MARGIN = 12  # px, half-width of the near-sand box
+
+
+@njit(cache=True)
+def _count_path_hits(occ, x1, y1, x2, y2, num_samples, screen_width, screen_height):
+    """Sample a segment on the occupancy grid; returns (hazard_count, sand_count)."""
+    height, width = occ.shape
+    hazard_count = 0
+    sand_count = 0
+    for i in range(num_samples):
+        t = i / (num_samples - 1) if num_samples > 1 else 0.0
+        x = x1 + t * (x2 - x1)
+        y = y1 + t * (y2 - y1)
+
+        map_x = max(0, min(width - 1, int((x / screen_width) * width)))
+        map_y = max(0, min(height - 1, int((y / screen_height) * height)))
+
+        cell = occ[map_y, map_x]
+        if cell & OCC_HAZARD:
+            hazard_count += 1
+        elif cell & OCC_SAND:
+            sand_count += 1
+    return hazard_count, sand_count
+
+
+@lru_cache(maxsize=None)
+def _path_ts(num_samples):
+    """Segment parameters 0..1 for num_samples samples (read-only, shared)."""
+    ts = np.linspace(0.0, 1.0, num_samples)
+    ts.flags.writeable = False
+    return ts
+
+
+def _count_path_hits_numpy(occ, x1, y1, x2, y2, num_samples, screen_width, screen_height):
+    """_count_path_hits as one gather over all samples (used without numba)."""
+    height, width = occ.shape
+    ts = _path_ts(num_samples)
+    map_x = np.clip(((x1 + ts * (x2 - x1)) / screen_width * width).astype(np.int32), 0, width - 1)
+    map_y = np.clip(((y1 + ts * (y2 - y1)) / screen_height * height).astype(np.int32), 0, height - 1)
+    cells = occ[map_y, map_x]
+    hazard = (cells & OCC_HAZARD) != 0
+    sand = ~hazard & ((cells & OCC_SAND) != 0)
+    return int(hazard.sum()), int(sand.sum())
+
+
+_path_hits = _count_path_hits if NUMBA_AVAILABLE else _count_path_hits_numpy
+
+
+@njit(cache=True)
+def _ray_hazard_counts(occ, hazard_sat, x1, y1, xs, ys, num_samples, screen_width, screen_height):
+    """
+    Hazard samples on each ray (x1,y1)->(xs[i],ys[i]). Rays whose bounding box
+    holds no hazard cell (summed-area lookup) are answered without sampling.
+    """
+    height, width = occ.shape
+    counts = np.zeros(xs.shape[0], dtype=np.int64)
+    for i in range(xs.shape[0]):
+        mx0 = max(0, min(width - 1, int((min(x1, xs[i]) / screen_width) * width)))
+        my0 = max(0, min(height - 1, int((min(y1, ys[i]) / screen_height) * height)))
+        mx1 = max(0, min(width - 1, int((max(x1, xs[i]) / screen_width) * width)))
+        my1 = max(0, min(height - 1, int((max(y1, ys[i]) / screen_height) * height)))
+        boxed = (hazard_sat[my1 + 1, mx1 + 1] - hazard_sat[my0, mx1 + 1]
+                 - hazard_sat[my1 + 1, mx0] + hazard_sat[my0, mx0])
+        if boxed > 0:
+            counts[i] = _count_path_hits(occ, x1, y1, xs[i], ys[i], num_samples,
+                                         screen_width, screen_height)[0]
+    return counts
+
+
+@njit(cache=True)
+def _ring_search_safe(occ, cx, cy, max_radius, step, min_x, max_x, min_y, max_y,
+                      screen_width, screen_height):
+    """
+    Concentric-ring search for the first point that is neither sand nor hazard
+    and has a clear 12-sample path from (cx,cy). Returns (found, x, y).
+    """
+    height, width = occ.shape
+    r = step
+    while r <= max_radius:
+        # sample N points on ring proportional to circumference (clamped)
+        samples = max(8, int(2 * math.pi * r / step))
+        for i in range(samples):
+            a = (i / samples) * 2 * math.pi
+            tx = max(min_x, min(max_x, cx + math.cos(a) * r))
+            ty = max(min_y, min(max_y, cy + math.sin(a) * r))
+
+            map_x = max(0, min(width - 1, int((tx / screen_width) * width)))
+            map_y = max(0, min(height - 1, int((ty / screen_height) * height)))
+            if occ[map_y, map_x] != 0:
+                continue
+
+            hazard_count, sand_count = _count_path_hits(occ, cx, cy, tx, ty, 12,
+                                                        screen_width, screen_height)
+            if hazard_count == 0 and sand_count < 2:
+                return True, tx, ty
+        r += step
+    return False, cx, cy
+
+
+@njit(cache=True)
+def _relax(near_y, near_x, y, x, ny, nx):
+    """Adopt neighbour (ny,nx)'s nearest safe cell if it is closer to (y,x)."""
+    h, w = near_y.shape
+    if ny < 0 or ny >= h or nx < 0 or nx >= w or near_y[ny, nx] < 0:
+        return
+    sy = near_y[ny, nx]
+    sx = near_x[ny, nx]
+    d = (sy - y) ** 2 + (sx - x) ** 2
+    if near_y[y, x] < 0 or d < (near_y[y, x] - y) ** 2 + (near_x[y, x] - x) ** 2:
+        near_y[y, x] = sy
+        near_x[y, x] = sx
+
+
+@njit(cache=True)
+def _nearest_safe_cells(unsafe):
+    """
+    Nearest safe cell for every map cell, by two-pass vector propagation
+    (Danielsson-style Euclidean transform). Returns (rows, cols); -1 if the
+    map has no safe cell at all.
+    """
+    h, w = unsafe.shape
+    near_y = np.full((h, w), -1, dtype=np.int32)
+    near_x = np.full((h, w), -1, dtype=np.int32)
+    for y in range(h):
+        for x in range(w):
+            if not unsafe[y, x]:
+                near_y[y, x] = y
+                near_x[y, x] = x
+
+    for y in range(h):
+        for x in range(w):
+            _relax(near_y, near_x, y, x, y - 1, x - 1)
+            _relax(near_y, near_x, y, x, y - 1, x)
+            _relax(near_y, near_x, y, x, y - 1, x + 1)
+            _relax(near_y, near_x, y, x, y, x - 1)
+        for x in range(w - 1, -1, -1):
+            _relax(near_y, near_x, y, x, y, x + 1)
+
+    for y in range(h - 1, -1, -1):
+        for x in range(w - 1, -1, -1):
+            _relax(near_y, near_x, y, x, y + 1, x + 1)
+            _relax(near_y, near_x, y, x, y + 1, x)
+            _relax(near_y, near_x, y, x, y + 1, x - 1)
+            _relax(near_y, near_x, y, x, y, x + 1)
+        for x in range(w):
+            _relax(near_y, near_x, y, x, y, x - 1)
+
+    return near_y, near_x
 
 
 class MapLoader:
@@ -20,59 +184,194 @@ class MapLoader:
             self.width, self.height = 32, 32
             self.pixels = np.zeros((32, 32, 3), dtype=np.uint8)
             self.pixels[:, :] = [100, 200, 100]  # Green fairway
+
+        self._occ = self._build_occupancy(self.pixels)
+        self.sand_mask = (self._occ & OCC_SAND) != 0
+        self.hazard_mask = (self._occ & OCC_HAZARD) != 0
+        self.unsafe_mask = self.sand_mask | self.hazard_mask
+        self.hazard_sat = self._summed_area(self.hazard_mask)
+        self.sand_sat = self._summed_area(self.sand_mask)
+        self.unsafe_sat = self._summed_area(self.unsafe_mask)
+        self.nearest_safe_y, self.nearest_safe_x = _nearest_safe_cells(self.unsafe_mask)
+        self.landing_score_grid = self._build_landing_grid()
+        self.plan_grid = None
+        self._plan_grid_key = None
+        self._path_cache = {}
+
+    def _build_landing_grid(self, screen_width=640, screen_height=640):
+        """
+        Per screen pixel terrain penalty for landing there: hazard, sand, or
+        sand within LANDING_NEAR_SAND_MARGIN px (same box as sand_in_box).
+        """
+        cols = np.minimum((np.arange(screen_width) / screen_width * self.width).astype(np.intp),
+                          self.width - 1)
+        rows = np.minimum((np.arange(screen_height) / screen_height * self.height).astype(np.intp),
+                          self.height - 1)
+        sand = self.sand_mask[np.ix_(rows, cols)]
+        hazard = self.hazard_mask[np.ix_(rows, cols)]
+
+        # box dilation of the sand pixels via prefix sums, clamped at the edges
+        m = LANDING_NEAR_SAND_MARGIN
+        counts = sand.astype(np.int32)
+        for axis, n in ((0, screen_height), (1, screen_width)):
+            prefix = np.concatenate([np.zeros_like(counts.take([0], axis=axis)),
+                                     np.cumsum(counts, axis=axis)], axis=axis)
+            lo = np.clip(np.arange(n) - m, 0, n)
+            hi = np.clip(np.arange(n) + m + 1, 0, n)
+            counts = prefix.take(hi, axis=axis) - prefix.take(lo, axis=axis)
+        near_sand = counts > 0
+
+        grid = np.where(near_sand, LANDING_NEAR_SAND_PENALTY, 0.0)
+        grid[sand] = LANDING_SAND_PENALTY
+        grid[hazard] = LANDING_HAZARD_PENALTY
+        return grid.astype(np.float32)
+
+    def build_plan_grid(self, hole_x, hole_y, screen_width=640, screen_height=640):
+        """
+        Per screen pixel landing score for a hole: landing_score_grid plus the
+        distance from the pixel centre to the hole. Sand and hazard pixels keep
+        their bare penalty so callers can tell them apart. Cached per hole.
+        """
+        key = (float(hole_x), float(hole_y))
+        if self._plan_grid_key != key:
+            ys, xs = np.mgrid[:screen_height, :screen_width]
+            dist = np.hypot(xs + 0.5 - key[0], ys + 0.5 - key[1])
+            grid = self.landing_score_grid.astype(np.float64)
+            clear = grid < LANDING_SAND_PENALTY
+            grid[clear] += dist[clear]
+            self.plan_grid = grid.astype(np.float32)
+            self._plan_grid_key = key
+        return self.plan_grid
+
+    @staticmethod
+    def _summed_area(mask):
+        """Zero-padded integral image: sat[y, x] = mask[:y, :x].sum()."""
+        sat = np.zeros((mask.shape[0] + 1, mask.shape[1] + 1), dtype=np.int32)
+        sat[1:, 1:] = mask.cumsum(0).cumsum(1)
+        return sat
+
+    @staticmethod
+    def _box_count(sat, mx0, my0, mx1, my1):
+        """Cells set in the inclusive map-cell box [mx0,mx1] x [my0,my1], O(1)."""
+        return int(sat[my1 + 1, mx1 + 1] - sat[my0, mx1 + 1] - sat[my1 + 1, mx0] + sat[my0, mx0])
+
+    @staticmethod
+    def _build_occupancy(pixels):
+        """Classify every map pixel once into hazard/sand occupancy bits."""
+        r = pixels[:, :, 0].astype(np.int16)
+        g = pixels[:, :, 1].astype(np.int16)
+        b = pixels[:, :, 2].astype(np.int16)
+
+        hazard = (b > 120) & (b > g + 20) & (b > r + 20)
+        sand = (r > 130) & (g > 130) & (b < 100) & (np.abs(r - g) < 30)
+
+        occ = np.zeros(pixels.shape[:2], dtype=np.uint8)
+        occ[hazard] |= OCC_HAZARD
+        occ[sand] |= OCC_SAND
+        return occ
     
     def is_sand(self, x, y, screen_width=640, screen_height=640):
         """Check if position (x,y) in screen coordinates is sand"""
-        # Convert screen coords to map coords
-        map_x = int((x / screen_width) * self.width)
-        map_y = int((y / screen_height) * self.height)
-        
-        # Clamp to bounds
-        map_x = max(0, min(self.width - 1, map_x))
-        map_y = max(0, min(self.height - 1, map_y))
-        
-        # Get pixel color
-        r, g, b = self.pixels[map_y, map_x]
-        
-        # Sand detection (from C code)
-        # R > 130 && G > 130 && B < 100 && abs(R - G) < 30
-        if r > 130 and g > 130 and b < 100 and abs(int(r) - int(g)) < 30:
-            return True
-        return False
+        map_x, map_y = self._to_map(x, y, screen_width, screen_height)
+        return bool(self.sand_mask[map_y, map_x])
     
+    def _to_map(self, x, y, screen_width=640, screen_height=640):
+        """Screen coords -> clamped map (column, row)."""
+        map_x = max(0, min(self.width - 1, int((x / screen_width) * self.width)))
+        map_y = max(0, min(self.height - 1, int((y / screen_height) * self.height)))
+        return map_x, map_y
+
+    def sand_at(self, xs, ys, screen_width=640, screen_height=640):
+        """Vectorized is_sand: boolean array for arrays of screen coords."""
+        map_x = (np.asarray(xs, dtype=float) / screen_width * self.width).astype(np.intp)
+        map_y = (np.asarray(ys, dtype=float) / screen_height * self.height).astype(np.intp)
+        np.clip(map_x, 0, self.width - 1, out=map_x)
+        np.clip(map_y, 0, self.height - 1, out=map_y)
+        return self.sand_mask[map_y, map_x]
+
+    def sand_in_box(self, x0, y0, x1, y1, screen_width=640, screen_height=640):
+        """True if any sand lies in the screen-space box [x0,x1] x [y0,y1]."""
+        mx0, my0 = self._to_map(x0, y0, screen_width, screen_height)
+        mx1, my1 = self._to_map(x1, y1, screen_width, screen_height)
+        if mx1 < mx0 or my1 < my0:
+            return False
+        return self._box_count(self.sand_sat, mx0, my0, mx1, my1) > 0
+
+    def nearest_safe(self, x, y, screen_width=640, screen_height=640):
+        """
+        Screen-space centre of the safe (non sand/hazard) map cell nearest to
+        (x,y), looked up from the precomputed transform. None if no safe cell.
+        """
+        map_x, map_y = self._to_map(x, y, screen_width, screen_height)
+        safe_y = self.nearest_safe_y[map_y, map_x]
+        if safe_y < 0:
+            return None
+        safe_x = self.nearest_safe_x[map_y, map_x]
+        return ((safe_x + 0.5) * screen_width / self.width,
+                (safe_y + 0.5) * screen_height / self.height)
+
+    def find_safe_on_rings(self, cx, cy, max_radius, step, min_x, max_x, min_y, max_y):
+        """
+        Ring search around (cx,cy) for a safe point reachable by a clear path,
+        with candidates clamped to [min_x,max_x] x [min_y,max_y]. None if none.
+        """
+        found, tx, ty = _ring_search_safe(self._occ, float(cx), float(cy),
+                                          float(max_radius), float(step),
+                                          float(min_x), float(max_x), float(min_y), float(max_y),
+                                          640.0, 640.0)
+        return (tx, ty) if found else None
+
+    def is_unsafe(self, x, y, screen_width=640, screen_height=640):
+        """is_sand or is_hazard as one occupancy-bit test."""
+        map_x, map_y = self._to_map(x, y, screen_width, screen_height)
+        return bool(self.unsafe_mask[map_y, map_x])
+
     def is_hazard(self, x, y, screen_width=640, screen_height=640):
         """Check if position is water/hazard"""
-        map_x = int((x / screen_width) * self.width)
-        map_y = int((y / screen_height) * self.height)
-        
-        map_x = max(0, min(self.width - 1, map_x))
-        map_y = max(0, min(self.height - 1, map_y))
-        
-        r, g, b = self.pixels[map_y, map_x]
-        
-        # Water/hazard: B > 120 && B > G + 20 && B > R + 20
-        if b > 120 and b > g + 20 and b > r + 20:
-            return True
-        return False
+        map_x, map_y = self._to_map(x, y, screen_width, screen_height)
+        return bool(self.hazard_mask[map_y, map_x])
     
     def check_path_clear(self, x1, y1, x2, y2, num_samples=20):
         """
         Check if path from (x1,y1) to (x2,y2) avoids sand/hazards
         Returns: (is_clear, hazard_count, sand_count)
         """
-        hazard_count = 0
-        sand_count = 0
-        
-        for i in range(num_samples):
-            t = i / (num_samples - 1) if num_samples > 1 else 0
-            x = x1 + t * (x2 - x1)
-            y = y1 + t * (y2 - y1)
-            
-            if self.is_hazard(x, y):
-                hazard_count += 1
-            elif self.is_sand(x, y):
-                sand_count += 1
+        # every sample lies in the segment's bounding box: if the summed-area
+        # table says that box holds no sand/hazard, nothing can be hit
+        mx0, my0 = self._to_map(min(x1, x2), min(y1, y2))
+        mx1, my1 = self._to_map(max(x1, x2), max(y1, y2))
+        if self._box_count(self.unsafe_sat, mx0, my0, mx1, my1) == 0:
+            return True, 0, 0
+
+        hazard_count, sand_count = _path_hits(
+            self._occ, float(x1), float(y1), float(x2), float(y2),
+            num_samples, 640.0, 640.0
+        )
         
         # Stricter: no hazards, minimal sand
         is_clear = (hazard_count == 0 and sand_count < 2)
         return is_clear, hazard_count, sand_count
+
+    def ray_hazard_counts(self, x1, y1, xs, ys, num_samples=20):
+        """Hazard sample count (as in check_path_clear) for each ray (x1,y1)->(xs,ys)."""
+        return _ray_hazard_counts(self._occ, self.hazard_sat, float(x1), float(y1),
+                                  np.asarray(xs, dtype=float), np.asarray(ys, dtype=float),
+                                  num_samples, 640.0, 640.0)
+
+    def check_path_clear_cached(self, x1, y1, x2, y2, num_samples=20):
+        """
+        check_path_clear with endpoints snapped to a PATH_CACHE_QUANTUM grid,
+        memoized so near-duplicate segments are a dict hit.
+        """
+        q = PATH_CACHE_QUANTUM
+        key = (int(x1 // q), int(y1 // q), int(x2 // q), int(y2 // q), num_samples)
+        result = self._path_cache.get(key)
+        if result is None:
+            if len(self._path_cache) >= PATH_CACHE_SIZE:
+                self._path_cache.clear()
+            half = q / 2
+            result = self.check_path_clear(key[0] * q + half, key[1] * q + half,
+                                           key[2] * q + half, key[3] * q + half,
+                                           num_samples)
+            self._path_cache[key] = result
+        return result
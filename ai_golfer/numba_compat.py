@@ -0,0 +1,22 @@
+"""
+Numba compatibility shim - JIT-compile numeric kernels when numba is installed,
+and run the very same functions as plain Python when it is not.
+"""
+
+try:
+    from numba import config, njit, prange
+    NUMBA_AVAILABLE = True
+
+    # Parallel kernels are launched from the pipe client's worker thread;
+    # with TBB that leaves the process hanging at interpreter exit, so
+    # prefer OpenMP, then numba's own workqueue (always available).
+    config.THREADING_LAYER_PRIORITY = ["omp", "workqueue", "tbb"]
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """Stand-in for numba.njit; supports both @njit and @njit(...)."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda fn: fn
@@ -2,22 +2,253 @@
 
 import math
 import numpy as np
+from numba_compat import njit, prange, NUMBA_AVAILABLE
+
+# physics constants (shared by SurrogatePhysics and the compiled kernel)
+GRAVITY = 800.0
+DT = 0.016
+LAUNCH_SCALE = 4.0
+Z_SCALE = 0.6
+AIR_DRAG = 1.6
+STOP_SPEED = 2.0
+MAX_STEPS = 900
+WIND_SMOOTHNESS = 0.25
+GROUND_WIND_FACTOR = 0.08
+SPIN_AIR_DAMP = 0.996
+SPIN_GROUND_DAMP = 0.985
+
+# per-step products of the constants above, folded once for the integrators
+_GRAVITY_DT = GRAVITY * DT
+_AIR_KEEP = 1.0 - AIR_DRAG * DT
+_GROUND_WIND_DT = GROUND_WIND_FACTOR * DT
+_STOP_SPEED_SQ = STOP_SPEED * STOP_SPEED
+
+
+@njit(cache=True, nogil=True, fastmath=True)
+def _launch_velocity_njit(dirx, diry, angle, power):
+    """Initial (vx, vy, vz) of a shot; (dirx, diry) need not be unit length."""
+    # --- normalize direction ---
+    d = math.hypot(dirx, diry)
+    if d < 1e-6:
+        dirx, diry = 0.0, -1.0
+    else:
+        dirx /= d
+        diry /= d
+
+    # --- initial velocity (matches C) ---
+    ang = math.radians(angle)
+    launch = power * LAUNCH_SCALE
+    horiz = launch * math.cos(ang)
+    return horiz * dirx, horiz * diry, launch * math.sin(ang) * Z_SCALE
+
+
+@njit(cache=True, nogil=True, fastmath=True)
+def _fly_njit(sx, sy, vx, vy, vz, wind_x, wind_y, wind_strength, spiny, damp, bounce):
+    """
+    Integrate a launched ball until it stops; returns the final (x, y).
+    spinx only decays and never feeds back into the trajectory, so it is
+    not an input.
+    """
+    x, y, z = sx, sy, 0.0
+    wind_smooth = 0.0
+
+    # wind acceleration per unit of smoothed strength, in the air / on the ground
+    air_wx = wind_x * DT
+    air_wy = wind_y * DT
+    ground_wx = wind_x * _GROUND_WIND_DT
+    ground_wy = wind_y * _GROUND_WIND_DT
+
+    for _ in range(MAX_STEPS):
+
+        # gravity
+        vz -= _GRAVITY_DT
+
+        # integrate pos
+        x += vx * DT
+        y += vy * DT
+        z += vz * DT
+
+        airborne = z > 1.0
+
+        # update smoothed wind
+        wind_smooth += (wind_strength - wind_smooth) * WIND_SMOOTHNESS
+
+        # apply wind
+        if airborne:
+            vx += air_wx * wind_smooth
+            vy += air_wy * wind_smooth
+
+            # magnus
+            mx = -spiny * vy * 0.0012
+            my = spiny * vx * 0.0012
+            mx = max(-10.0, min(10.0, mx))
+            my = max(-10.0, min(10.0, my))
+            vx += mx
+            vy += my
+
+            # drag
+            vx *= _AIR_KEEP
+            vy *= _AIR_KEEP
+
+            spiny *= SPIN_AIR_DAMP
+
+        else:
+            vx += ground_wx * wind_smooth
+            vy += ground_wy * wind_smooth
+
+            spiny *= SPIN_GROUND_DAMP
+
+        # ground collision. Kept as a branch: a shot is airborne for one long
+        # run of steps and then on the ground for the rest, so it predicts
+        # well; select/mask formulations measured ~1.6x slower here
+        if z <= 0:
+            z = 0.0
+            if abs(vz) > 10 and bounce > 0.01:
+                vz = -vz * bounce
+            else:
+                vz = 0.0
+
+            vx *= damp
+            vy *= damp
+
+        # stop. The only exit: cutting off balls rolling away from the target
+        # (tried for the scoring kernels) never paid for its per-step test,
+        # as CMA-ES candidates seldom overshoot far enough to trigger it
+        if vx * vx + vy * vy < _STOP_SPEED_SQ and z < 0.1 and abs(vz) < 0.2:
+            break
+
+    return x, y
+
+
+@njit(cache=True, nogil=True, fastmath=True)
+def simulate_shot_njit(sx, sy, dirx, diry, angle, power,
+                       wind_x, wind_y, wind_strength,
+                       spinx, spiny, damp, bounce):
+    """
+    Pure-numeric core of SurrogatePhysics.simulate_shot. Terrain is passed as
+    its ground damping/bounce factors. Returns the final (x, y).
+    fastmath: every input is finite, so NaN/inf-strict ordering buys nothing.
+    """
+    vx, vy, vz = _launch_velocity_njit(dirx, diry, angle, power)
+    return _fly_njit(sx, sy, vx, vy, vz, wind_x, wind_y, wind_strength, spiny, damp, bounce)
+
+
+@njit(cache=True, parallel=True, nogil=True, fastmath=True)
+def _robust_score_njit(ball_x, ball_y, dir_angle, angle, power, spinx, spiny,
+                       wind_x, wind_y, wind_strength, target_x, target_y, damp, bounce,
+                       variance_weight):
+    """Fused direction + simulate + miss distance for n candidates x k winds,
+    reduced in place to mean + variance_weight * variance per candidate."""
+    n, k = wind_x.shape
+    scores = np.empty(n)
+    for i in prange(n):
+        vx, vy, vz = _launch_velocity_njit(math.cos(dir_angle[i]), math.sin(dir_angle[i]),
+                                           angle[i], power[i])
+        errors = np.empty(k)
+        for j in range(k):
+            fx, fy = _fly_njit(ball_x, ball_y, vx, vy, vz,
+                               wind_x[i, j], wind_y[i, j], wind_strength, spiny[i], damp, bounce)
+            errors[j] = math.hypot(fx - target_x[i], fy - target_y[i])
+        mean = errors.mean()
+        scores[i] = mean + ((errors - mean) ** 2).mean() * variance_weight
+    return scores
+
+
+def _simulate_shot_batch_numpy(sx, sy, dirx, diry, angle, power,
+                               wind_x, wind_y, wind_strength,
+                               spinx, spiny, damp, bounce):
+    """
+    NumPy lockstep version of simulate_shot_njit: every lane advances one
+    step per iteration, and lanes that stop are retired from the state.
+    """
+    d = np.hypot(dirx, diry)
+    short = d < 1e-6
+    d = np.where(short, 1.0, d)
+    dirx = np.where(short, 0.0, dirx / d)
+    diry = np.where(short, -1.0, diry / d)
+
+    ang = np.radians(angle)
+    launch = power * LAUNCH_SCALE
+    horiz = launch * np.cos(ang)
+
+    # one row per state variable, one column per lane (spinx only decays and
+    # never feeds back into the trajectory, so it is not tracked)
+    n = sx.shape[0]
+    lanes = np.vstack([
+        sx, sy, np.zeros(n),                                # x, y, z
+        horiz * dirx, horiz * diry, launch * np.sin(ang) * Z_SCALE,   # vx, vy, vz
+        spiny, np.zeros(n),                                 # spiny, wind_smooth
+        wind_x * DT, wind_y * DT, wind_strength, np.arange(n),   # inputs, lane index
+    ]).astype(float)
+    final_x = np.array(sx, dtype=float)
+    final_y = np.array(sy, dtype=float)
+    bouncy = bounce > 0.01
+
+    for _ in range(MAX_STEPS):
+        x, y, z, vx, vy, vz, spin_y, wind_smooth, wx, wy, ws, idx = lanes
+
+        # gravity, integrate pos
+        vz -= _GRAVITY_DT
+        x += vx * DT
+        y += vy * DT
+        z += vz * DT
+
+        airborne = z > 1.0
+
+        # smoothed wind
+        wind_smooth += (ws - wind_smooth) * WIND_SMOOTHNESS
+        ax = vx + wx * wind_smooth
+        ay = vy + wy * wind_smooth
+
+        # magnus + drag while airborne
+        mx = np.clip(-spin_y * ay * 0.0012, -10.0, 10.0)
+        my = np.clip(spin_y * ax * 0.0012, -10.0, 10.0)
+        ax += mx
+        ay += my
+        ax *= _AIR_KEEP
+        ay *= _AIR_KEEP
+
+        vx[:] = np.where(airborne, ax, vx + wx * wind_smooth * GROUND_WIND_FACTOR)
+        vy[:] = np.where(airborne, ay, vy + wy * wind_smooth * GROUND_WIND_FACTOR)
+        spin_y *= np.where(airborne, SPIN_AIR_DAMP, SPIN_GROUND_DAMP)
+
+        # ground collision
+        ground = z <= 0
+        if ground.any():
+            z[ground] = 0.0
+            vz[:] = np.where(ground, np.where((np.abs(vz) > 10) & bouncy, -vz * bounce, 0.0), vz)
+            vx[ground] *= damp
+            vy[ground] *= damp
+
+        # stop
+        stopped = (vx * vx + vy * vy < _STOP_SPEED_SQ) & (z < 0.1) & (np.abs(vz) < 0.2)
+        if stopped.any():
+            done = idx[stopped].astype(np.intp)
+            final_x[done] = x[stopped]
+            final_y[done] = y[stopped]
+            lanes = lanes[:, ~stopped]
+            if lanes.shape[1] == 0:
+                return final_x, final_y
+
+    live = lanes[11].astype(np.intp)
+    final_x[live] = lanes[0]
+    final_y[live] = lanes[1]
+    return final_x, final_y
+
 
 class SurrogatePhysics:
     def __init__(self):
-        self.GRAVITY = 800.0
-        self.DT = 0.016
-        self.LAUNCH_SCALE = 4.0
-        self.Z_SCALE = 0.6
-        self.AIR_DRAG = 1.6
-        self.STOP_SPEED = 2.0
-        self.MAX_STEPS = 900
-        self.WIND_SMOOTHNESS = 0.25
-        self.GROUND_WIND_FACTOR = 0.08
-        self.SPIN_AIR_DAMP = 0.996
-        self.SPIN_GROUND_DAMP = 0.985
-
-        self.wind_smooth = 0.0
+        self.GRAVITY = GRAVITY
+        self.DT = DT
+        self.LAUNCH_SCALE = LAUNCH_SCALE
+        self.Z_SCALE = Z_SCALE
+        self.AIR_DRAG = AIR_DRAG
+        self.STOP_SPEED = STOP_SPEED
+        self.MAX_STEPS = MAX_STEPS
+        self.WIND_SMOOTHNESS = WIND_SMOOTHNESS
+        self.GROUND_WIND_FACTOR = GROUND_WIND_FACTOR
+        self.SPIN_AIR_DAMP = SPIN_AIR_DAMP
+        self.SPIN_GROUND_DAMP = SPIN_GROUND_DAMP
 
         # match C physics
         self.terrain_damping = {
@@ -38,99 +269,87 @@ class SurrogatePhysics:
             "forest": 0.0,
         }
 
+        self.landing_penalty = {
+            "fairway": 0, "smooth": -10,
+            "rough": 20, "sand": 50,
+            "water": 1000, "forest": 1000
+        }
+
     # --------------------------------------------------------------
 
+    def ground_factors(self, terrain):
+        """(damping, bounce) for a terrain name, as simulate_shot_njit takes them."""
+        return self.terrain_damping.get(terrain, 0.96), self.terrain_bounce.get(terrain, 0)
+
     def simulate_shot(self, sx, sy, dirx, diry, angle, power,
                       wind_x, wind_y, wind_strength,
                       spinx, spiny, terrain):
 
-        # --- normalize direction ---
-        d = math.hypot(dirx, diry)
-        if d < 1e-6:
-            dirx, diry = 0.0, -1.0
-        else:
-            dirx /= d
-            diry /= d
-
-        # --- initial velocity (matches C) ---
-        ang = math.radians(angle)
-        launch = power * self.LAUNCH_SCALE
-        horiz = launch * math.cos(ang)
-
-        vx = horiz * dirx
-        vy = horiz * diry
-        vz = launch * math.sin(ang) * self.Z_SCALE
-
-        x, y, z = sx, sy, 0.0
-        self.wind_smooth = 0.0
-
-        for _ in range(self.MAX_STEPS):
-
-            # gravity
-            vz -= self.GRAVITY * self.DT
-
-            # integrate pos
-            x += vx * self.DT
-            y += vy * self.DT
-            z += vz * self.DT
-
-            airborne = z > 1.0
-
-            # update smoothed wind
-            self.wind_smooth += (wind_strength - self.wind_smooth) * self.WIND_SMOOTHNESS
-
-            # apply wind
-            if airborne:
-                vx += wind_x * self.wind_smooth * self.DT
-                vy += wind_y * self.wind_smooth * self.DT
-
-                # magnus
-                mx = -spiny * vy * 0.0012
-                my =  spiny * vx * 0.0012
-                mx = max(-10.0, min(10.0, mx))
-                my = max(-10.0, min(10.0, my))
-                vx += mx
-                vy += my
-
-                # drag
-                vx -= vx * self.AIR_DRAG * self.DT
-                vy -= vy * self.AIR_DRAG * self.DT
-
-                spinx *= self.SPIN_AIR_DAMP
-                spiny *= self.SPIN_AIR_DAMP
-
-            else:
-                vx += wind_x * self.wind_smooth * self.GROUND_WIND_FACTOR * self.DT
-                vy += wind_y * self.wind_smooth * self.GROUND_WIND_FACTOR * self.DT
+        damp, bounce = self.ground_factors(terrain)
+        x, y = simulate_shot_njit(float(sx), float(sy), float(dirx), float(diry),
+                                  float(angle), float(power),
+                                  float(wind_x), float(wind_y), float(wind_strength),
+                                  float(spinx), float(spiny), float(damp), float(bounce))
+        return x, y, {"terrain": terrain}
 
-                spinx *= self.SPIN_GROUND_DAMP
-                spiny *= self.SPIN_GROUND_DAMP
+    def simulate_shot_batch(self, sx, sy, dirx, diry, angle, power,
+                            wind_x, wind_y, wind_strength,
+                            spinx, spiny, terrain):
+        """
+        simulate_shot over arrays of shots (scalars broadcast), all played
+        from one terrain. Returns (final_x, final_y) arrays.
+        """
+        lanes = np.broadcast_arrays(*(np.asarray(a, dtype=float).ravel() for a in
+                                      (sx, sy, dirx, diry, angle, power,
+                                       wind_x, wind_y, wind_strength, spinx, spiny)))
+        damp, bounce = self.ground_factors(terrain)
+        return _simulate_shot_batch_numpy(*lanes, float(damp), float(bounce))
 
-            # ground collision
-            if z <= 0:
-                z = 0
-                if abs(vz) > 10 and self.terrain_bounce.get(terrain, 0) > 0.01:
-                    vz = -vz * self.terrain_bounce.get(terrain, 0)
-                else:
-                    vz = 0
+    def score_batch(self, ball_x, ball_y, dir_angle, angle, power, spinx, spiny,
+                    wind_x, wind_y, wind_strength, target_x, target_y, terrain):
+        """
+        Miss distance of n candidate shots from one ball position, each played
+        under k winds. Candidate params (direction in radians) and targets are
+        length-n arrays (or scalars), wind_x/wind_y are (n, k). Returns (n, k).
+        """
+        wind_x, wind_y = np.broadcast_arrays(np.asarray(wind_x, dtype=float),
+                                             np.asarray(wind_y, dtype=float))
+        n, k = wind_x.shape
+        dir_angle, angle, power, spinx, spiny, target_x, target_y = (
+            np.broadcast_to(np.asarray(a, dtype=float), (n,))
+            for a in (dir_angle, angle, power, spinx, spiny, target_x, target_y))
 
-                damp = self.terrain_damping.get(terrain, 0.96)
-                vx *= damp
-                vy *= damp
+        final_x, final_y = self.simulate_shot_batch(
+            ball_x, ball_y, np.repeat(np.cos(dir_angle), k), np.repeat(np.sin(dir_angle), k),
+            np.repeat(angle, k), np.repeat(power, k), wind_x.ravel(), wind_y.ravel(), wind_strength,
+            np.repeat(spinx, k), np.repeat(spiny, k), terrain)
+        return np.hypot(final_x.reshape(n, k) - target_x[:, None], final_y.reshape(n, k) - target_y[:, None])
 
-            # stop
-            if math.hypot(vx, vy) < self.STOP_SPEED and z < 0.1 and abs(vz) < 0.2:
-                break
+    def robust_score_batch(self, ball_x, ball_y, dir_angle, angle, power, spinx, spiny,
+                           wind_x, wind_y, wind_strength, target_x, target_y, terrain,
+                           variance_weight):
+        """
+        score_batch reduced over the wind axis: per candidate, the mean miss
+        plus variance_weight * its variance. Returns (n,).
+        """
+        wind_x, wind_y = np.broadcast_arrays(np.asarray(wind_x, dtype=float),
+                                             np.asarray(wind_y, dtype=float))
+        if not NUMBA_AVAILABLE:
+            errors = self.score_batch(ball_x, ball_y, dir_angle, angle, power, spinx, spiny,
+                                      wind_x, wind_y, wind_strength, target_x, target_y, terrain)
+            return errors.mean(axis=1) + errors.var(axis=1) * variance_weight
 
-        return x, y, {"terrain": terrain}
+        n = wind_x.shape[0]
+        cand = [np.ascontiguousarray(np.broadcast_to(np.asarray(a, dtype=float), (n,)))
+                for a in (dir_angle, angle, power, spinx, spiny, target_x, target_y)]
+        damp, bounce = self.ground_factors(terrain)
+        return _robust_score_njit(float(ball_x), float(ball_y), *cand[:5],
+                                  np.ascontiguousarray(wind_x), np.ascontiguousarray(wind_y),
+                                  float(wind_strength), *cand[5:], float(damp), float(bounce),
+                                  float(variance_weight))
 
     # --------------------------------------------------------------
 
     def evaluate_landing_zone(self, x, y, hx, hy, terrain):
         base = math.hypot(x - hx, y - hy)
-        penalty = {
-            "fairway": 0, "smooth": -10,
-            "rough": 20, "sand": 50,
-            "water": 1000, "forest": 1000
-        }.get(terrain, 0)
-        return base + penalty
+        return base + self.landing_penalty.get(terrain, 0)